@@ -1,120 +1,194 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+import argparse
 import json
+import functools
+import hashlib
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from joblib import load
+import results_store
 
-def load_data(file_path):
-    return pd.read_csv(file_path)
+# Rows per chunk for the streaming pipeline (analyze_file / CLI)
+DEFAULT_CHUNK_SIZE = 50_000
 
-def generate_recommendation(row):
-    stress = row['Stress_Level']
-    sleep = row['Sleep_Hours']
-    exercise = row['Exercise_Hours']
-    academic = row.get('Academic_Workload', stress)
-    anxiety = row.get('Anxiety_Level', stress)
-    social = row.get('Social_Support', 5)
-    depression = row.get('Depression_Level', stress)
-    financial = row.get('Financial_Stress', stress)
-    relationship = row.get('Relationship_Stress', stress)
-    coping = row.get('Coping_Frequency', 5)
-    screen_time = row.get('Screen_Time', 5)
-    nutrition = row.get('Nutrition_Quality', 5)
-    self_esteem = row.get('Self_Esteem', 5)
-    work_life = row.get('Work_Life_Balance', 5)
-    future_opt = row.get('Future_Optimism', 5)
-    
-    overall_stress = (stress + academic + anxiety + depression + financial + relationship) / 6
-    
-    recommendations = {
-        'immediate_actions': [],
-        'long_term_strategies': [],
-        'resources': []
-    }
-    
+def _is_parquet(path):
+    return str(path).endswith('.parquet')
+
+def load_data(file_path, chunksize=None):
+    """Read a survey CSV or Parquet results file; with chunksize, return an
+    iterator of DataFrames.
+    """
+    if _is_parquet(file_path):
+        if chunksize:
+            return results_store.iter_results(file_path, batch_size=chunksize)
+        return results_store.read_results(file_path, legacy_csv_path=None)
+    return pd.read_csv(file_path, chunksize=chunksize)
+
+# Recommendation rules, in the order their text is emitted.  Each rule is
+# (predicate, immediate action, long-term strategy, resource); the predicate
+# receives the values from _rule_inputs and must work on scalars (one row)
+# as well as NumPy arrays (whole columns), so only comparisons and & are used.
+_RECOMMENDATION_RULES = [
     # Immediate Actions
-    if overall_stress > 8:
-        recommendations['immediate_actions'].append("Seek immediate professional help: Contact a counselor or therapist through your school's mental health services.")
-        recommendations['resources'].append("National Suicide Prevention Lifeline: 988")
-    elif overall_stress > 6:
-        recommendations['immediate_actions'].append("Practice deep breathing: 4-7-8 technique (inhale 4s, hold 7s, exhale 8s) for 5 minutes.")
-    
-    if anxiety > 7:
-        recommendations['immediate_actions'].append("Use grounding techniques: 5-4-3-2-1 method (5 things you see, 4 you can touch, 3 you hear, 2 you smell, 1 you taste).")
-    
-    if depression > 7:
-        recommendations['immediate_actions'].append("Reach out to a trusted friend or family member for support.")
-        recommendations['resources'].append("Depression support: Visit psychologytoday.com or call 1-800-950-NAMI")
-    
+    (lambda v: v['overall_stress'] > 8,
+     "Seek immediate professional help: Contact a counselor or therapist through your school's mental health services.",
+     None,
+     "National Suicide Prevention Lifeline: 988"),
+    (lambda v: (v['overall_stress'] > 6) & (v['overall_stress'] <= 8),
+     "Practice deep breathing: 4-7-8 technique (inhale 4s, hold 7s, exhale 8s) for 5 minutes.",
+     None,
+     None),
+    (lambda v: v['anxiety'] > 7,
+     "Use grounding techniques: 5-4-3-2-1 method (5 things you see, 4 you can touch, 3 you hear, 2 you smell, 1 you taste).",
+     None,
+     None),
+    (lambda v: v['depression'] > 7,
+     "Reach out to a trusted friend or family member for support.",
+     None,
+     "Depression support: Visit psychologytoday.com or call 1-800-950-NAMI"),
     # Sleep Recommendations
-    if sleep < 6:
-        recommendations['immediate_actions'].append("Create a wind-down routine: Dim lights, avoid screens 1 hour before bed, read or meditate.")
-        recommendations['long_term_strategies'].append("Maintain consistent sleep schedule, even on weekends. Aim for 7-9 hours nightly.")
-    elif sleep < 7:
-        recommendations['long_term_strategies'].append("Optimize your sleep environment: Cool, dark, quiet room. Consider a white noise machine.")
-    
+    (lambda v: v['sleep'] < 6,
+     "Create a wind-down routine: Dim lights, avoid screens 1 hour before bed, read or meditate.",
+     "Maintain consistent sleep schedule, even on weekends. Aim for 7-9 hours nightly.",
+     None),
+    (lambda v: (v['sleep'] >= 6) & (v['sleep'] < 7),
+     None,
+     "Optimize your sleep environment: Cool, dark, quiet room. Consider a white noise machine.",
+     None),
     # Exercise Recommendations
-    if exercise < 1:
-        recommendations['immediate_actions'].append("Start small: 10-minute walk today. Build up gradually.")
-        recommendations['long_term_strategies'].append("Incorporate daily movement: Walking, yoga, or sports 3-5 times per week.")
-    elif exercise < 2:
-        recommendations['long_term_strategies'].append("Increase to 150 minutes of moderate aerobic activity per week, plus strength training twice weekly.")
-    
+    (lambda v: v['exercise'] < 1,
+     "Start small: 10-minute walk today. Build up gradually.",
+     "Incorporate daily movement: Walking, yoga, or sports 3-5 times per week.",
+     None),
+    (lambda v: (v['exercise'] >= 1) & (v['exercise'] < 2),
+     None,
+     "Increase to 150 minutes of moderate aerobic activity per week, plus strength training twice weekly.",
+     None),
     # Social Support
-    if social < 5:
-        recommendations['immediate_actions'].append("Connect with someone today: Call a friend or join an online community.")
-        recommendations['long_term_strategies'].append("Build a support network: Join clubs, study groups, or volunteer organizations.")
-    
+    (lambda v: v['social'] < 5,
+     "Connect with someone today: Call a friend or join an online community.",
+     "Build a support network: Join clubs, study groups, or volunteer organizations.",
+     None),
     # Coping Strategies
-    if coping < 5:
-        recommendations['immediate_actions'].append("Try one healthy coping skill: Journaling, listening to music, or progressive muscle relaxation.")
-        recommendations['long_term_strategies'].append("Develop a coping toolkit: Learn techniques like mindfulness, CBT, or art therapy.")
-    
+    (lambda v: v['coping'] < 5,
+     "Try one healthy coping skill: Journaling, listening to music, or progressive muscle relaxation.",
+     "Develop a coping toolkit: Learn techniques like mindfulness, CBT, or art therapy.",
+     None),
     # Screen Time
-    if screen_time > 8:
-        recommendations['immediate_actions'].append("Set screen time limits: Use phone settings to track and limit recreational screen use.")
-        recommendations['long_term_strategies'].append("Create screen-free zones: No devices in bedroom, establish tech-free hours daily.")
-    
+    (lambda v: v['screen_time'] > 8,
+     "Set screen time limits: Use phone settings to track and limit recreational screen use.",
+     "Create screen-free zones: No devices in bedroom, establish tech-free hours daily.",
+     None),
     # Nutrition
-    if nutrition < 5:
-        recommendations['immediate_actions'].append("Eat a balanced meal today: Include protein, vegetables, and whole grains.")
-        recommendations['long_term_strategies'].append("Plan meals ahead: Focus on Mediterranean diet with plenty of fruits, vegetables, and omega-3 rich foods.")
-    
+    (lambda v: v['nutrition'] < 5,
+     "Eat a balanced meal today: Include protein, vegetables, and whole grains.",
+     "Plan meals ahead: Focus on Mediterranean diet with plenty of fruits, vegetables, and omega-3 rich foods.",
+     None),
     # Financial Stress
-    if financial > 7:
-        recommendations['immediate_actions'].append("Create a basic budget: Track income and expenses for one week.")
-        recommendations['resources'].append("Financial aid resources: Contact your school's financial aid office or visit finaid.org")
-    
+    (lambda v: v['financial'] > 7,
+     "Create a basic budget: Track income and expenses for one week.",
+     None,
+     "Financial aid resources: Contact your school's financial aid office or visit finaid.org"),
     # Relationship Stress
-    if relationship > 7:
-        recommendations['immediate_actions'].append("Communicate openly: Express your feelings calmly to the person involved.")
-        recommendations['long_term_strategies'].append("Consider counseling: Individual or couples therapy can help resolve conflicts.")
-    
+    (lambda v: v['relationship'] > 7,
+     "Communicate openly: Express your feelings calmly to the person involved.",
+     "Consider counseling: Individual or couples therapy can help resolve conflicts.",
+     None),
     # Academic Workload
-    if academic > 8:
-        recommendations['immediate_actions'].append("Break tasks down: Use the Pomodoro technique (25 min work, 5 min break).")
-        recommendations['long_term_strategies'].append("Develop study skills: Time management workshops, tutoring, or academic coaching.")
-    
+    (lambda v: v['academic'] > 8,
+     "Break tasks down: Use the Pomodoro technique (25 min work, 5 min break).",
+     "Develop study skills: Time management workshops, tutoring, or academic coaching.",
+     None),
     # Self-Esteem
-    if self_esteem < 5:
-        recommendations['immediate_actions'].append("Boost self-esteem: Practice positive affirmations and celebrate small achievements.")
-        recommendations['long_term_strategies'].append("Build self-confidence: Set achievable goals and track your progress.")
-    
+    (lambda v: v['self_esteem'] < 5,
+     "Boost self-esteem: Practice positive affirmations and celebrate small achievements.",
+     "Build self-confidence: Set achievable goals and track your progress.",
+     None),
     # Work-Life Balance
-    if work_life < 5:
-        recommendations['immediate_actions'].append("Set boundaries: Allocate specific times for study and relaxation.")
-        recommendations['long_term_strategies'].append("Improve balance: Schedule personal time and hobbies regularly.")
-    
+    (lambda v: v['work_life'] < 5,
+     "Set boundaries: Allocate specific times for study and relaxation.",
+     "Improve balance: Schedule personal time and hobbies regularly.",
+     None),
     # Future Optimism
-    if future_opt < 5:
-        recommendations['immediate_actions'].append("Focus on positives: List three things you're grateful for daily.")
-        recommendations['long_term_strategies'].append("Build optimism: Visualize positive outcomes and seek mentorship.")
-    
+    (lambda v: v['future_opt'] < 5,
+     "Focus on positives: List three things you're grateful for daily.",
+     "Build optimism: Visualize positive outcomes and seek mentorship.",
+     None),
     # Overall well-being
-    if overall_stress <= 5 and sleep >= 7 and exercise >= 2 and social >= 6:
-        recommendations['immediate_actions'].append("Maintain your healthy habits! You're doing great.")
-        recommendations['long_term_strategies'].append("Monitor for changes and continue preventive care.")
+    (lambda v: (v['overall_stress'] <= 5) & (v['sleep'] >= 7) & (v['exercise'] >= 2) & (v['social'] >= 6),
+     "Maintain your healthy habits! You're doing great.",
+     "Monitor for changes and continue preventive care.",
+     None),
+]
+
+_SECTION_HEADERS = ("**Immediate Actions:**", "**Long-term Strategies:**", "**Helpful Resources:**")
+
+_DEFAULT_RECOMMENDATION = "Your current wellness indicators look good. Continue monitoring and maintaining healthy habits. If you notice any changes, revisit this assessment."
+
+# Survey columns read by the rules; anything else in the frame is ignored
+_RULE_COLUMNS = [
+    'Stress_Level', 'Sleep_Hours', 'Exercise_Hours', 'Academic_Workload', 'Anxiety_Level',
+    'Social_Support', 'Depression_Level', 'Financial_Stress', 'Relationship_Stress',
+    'Coping_Frequency', 'Screen_Time', 'Nutrition_Quality', 'Self_Esteem',
+    'Work_Life_Balance', 'Future_Optimism',
+]
+
+def _rule_inputs(record):
+    """Collect rule inputs from a row (Series) or a mapping of column arrays.
+    Optional columns fall back to the same defaults the survey form uses.
+    """
+    stress = record['Stress_Level']
+    values = {
+        'stress': stress,
+        'sleep': record['Sleep_Hours'],
+        'exercise': record['Exercise_Hours'],
+        'academic': record.get('Academic_Workload', stress),
+        'anxiety': record.get('Anxiety_Level', stress),
+        'social': record.get('Social_Support', 5),
+        'depression': record.get('Depression_Level', stress),
+        'financial': record.get('Financial_Stress', stress),
+        'relationship': record.get('Relationship_Stress', stress),
+        'coping': record.get('Coping_Frequency', 5),
+        'screen_time': record.get('Screen_Time', 5),
+        'nutrition': record.get('Nutrition_Quality', 5),
+        'self_esteem': record.get('Self_Esteem', 5),
+        'work_life': record.get('Work_Life_Balance', 5),
+        'future_opt': record.get('Future_Optimism', 5),
+    }
+    values['overall_stress'] = (values['stress'] + values['academic'] + values['anxiety'] + values['depression'] + values['financial'] + values['relationship']) / 6
+    return values
+
+# Upper bound on distinct rule signatures kept formatted; most students share
+# a handful, but the theoretical space is 2**len(_RECOMMENDATION_RULES).
+_RECOMMENDATION_CACHE_SIZE = 4096
+
+@functools.lru_cache(maxsize=_RECOMMENDATION_CACHE_SIZE)
+def _recommendation_text(signature):
+    """Format the recommendation for a rule signature (bit i set = rule i fired).
+    The result is interned so every row with the same signature shares one string.
+    """
+    recommendations = {
+        'immediate_actions': [],
+        'long_term_strategies': [],
+        'resources': []
+    }
+    for i, (_, action, strategy, resource) in enumerate(_RECOMMENDATION_RULES):
+        if signature >> i & 1:
+            if action:
+                recommendations['immediate_actions'].append(action)
+            if strategy:
+                recommendations['long_term_strategies'].append(strategy)
+            if resource:
+                recommendations['resources'].append(resource)
     
     # Format the recommendation
     rec_text = ""
@@ -126,25 +200,261 @@ def generate_recommendation(row):
         rec_text += "**Helpful Resources:**\n" + "\n".join(f"• {resource}" for resource in recommendations['resources']) + "\n\n"
     
     if not rec_text:
-        rec_text = "Your current wellness indicators look good. Continue monitoring and maintaining healthy habits. If you notice any changes, revisit this assessment."
+        rec_text = _DEFAULT_RECOMMENDATION
     
-    return rec_text.strip()
+    return sys.intern(rec_text.strip())
+
+def generate_recommendation(row):
+    values = _rule_inputs(row)
+    signature = 0
+    for i, rule in enumerate(_RECOMMENDATION_RULES):
+        if rule[0](values):
+            signature |= 1 << i
+    return _recommendation_text(signature)
+
+def rule_signatures(df):
+    """Return the int64 rule signature of every row, evaluating each rule as a
+    boolean mask over whole columns.
+    """
+    n = len(df)
+    columns = {
+        c: df[c].to_numpy(dtype='float64', na_value=np.nan)
+        for c in _RULE_COLUMNS if c in df.columns
+    }
+    values = _rule_inputs(columns)
+    signatures = np.zeros(n, dtype=np.int64)
+    for i, rule in enumerate(_RECOMMENDATION_RULES):
+        mask = np.broadcast_to(rule[0](values), (n,))
+        signatures |= mask.astype(np.int64) << i
+    return signatures
+
+def generate_recommendations(df):
+    """Columnar equivalent of df.apply(generate_recommendation, axis=1).
+
+    Rows are reduced to rule signatures and each distinct signature is
+    formatted once through the shared cache, so the column holds references
+    to a few interned strings instead of one copy per row.
+    """
+    signatures = rule_signatures(df)
+    unique, inverse = np.unique(signatures, return_inverse=True)
+    texts = np.array([_recommendation_text(int(s)) for s in unique], dtype=object)
+    return pd.Series(texts[inverse.ravel()], index=df.index, name='Recommendation', dtype=object)
 
 def analyze_data(df):
     # Try to add model-based risk if a trained model is available
     try:
-        _load_model()
-        if _MODEL is not None:
-            df['Risk_Probability'] = _predict_risk(df)
+        snapshot = _load_model()
     except Exception:
-        # Be resilient; keep app running even if model load/predict fails
-        pass
+        snapshot = _NO_MODEL
+    if snapshot.model is not None:
+        try:
+            df['Risk_Probability'] = _predict_risk(df, snapshot)
+        except Exception:
+            # Be resilient; keep app running even if predict fails. The
+            # column is still added, so every chunk has the same layout
+            df['Risk_Probability'] = np.nan
 
-    df['Recommendation'] = df.apply(generate_recommendation, axis=1)
+    df['Recommendation'] = generate_recommendations(df)
     return df
 
-def save_results(df, output_path):
-    df.to_csv(output_path, index=False)
+def save_results(df, output_path, append=False):
+    """Write df to output_path; with append=True add rows without a header.
+    .parquet paths go through the typed results store (no append).
+    """
+    if _is_parquet(output_path):
+        if append:
+            raise ValueError('Parquet results cannot be appended to; use results_store.ResultsWriter')
+        results_store.write_results(df, output_path)
+        return
+    df.to_csv(output_path, mode='a' if append else 'w', header=not append, index=False)
+
+# Below this many rows a process pool costs more than it saves
+_MIN_PARALLEL_ROWS = 10_000
+
+def _init_worker():
+    """Process pool initializer: load the risk model once per worker."""
+    _load_model()
+
+def _process_pool(workers):
+    # spawn, not fork: the app calls this from a threaded server, and a
+    # forked worker would inherit locks held by its other threads
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, mp_context=get_context('spawn'))
+
+def _imap_ordered(pool, fn, items, max_pending):
+    """Like pool.map, but keeps at most max_pending items in flight so a lazy
+    iterable (e.g. CSV chunks) is never read far ahead of the writer.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def analyze_data_parallel(df, workers=None, chunk_size=None):
+    """Run analyze_data over row shards of df in a process pool.
+
+    workers defaults to the CPU count and chunk_size to an even split of a
+    few shards per worker. Results come back in the original row order with
+    the original index. Small frames are analyzed in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(df) < _MIN_PARALLEL_ROWS:
+        return analyze_data(df)
+    if not chunk_size:
+        chunk_size = max(1, -(-len(df) // (workers * 4)))
+    shards = [df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size)]
+    with _process_pool(workers) as pool:
+        results = list(pool.map(analyze_data, shards))
+    return pd.concat(results)
+
+def _rules_fingerprint():
+    """Digest of the recommendation rules, so editing them invalidates
+    recommendations stored by an incremental run.
+    """
+    digest = hashlib.sha256(_DEFAULT_RECOMMENDATION.encode())
+    for predicate, *texts in _RECOMMENDATION_RULES:
+        code = predicate.__code__
+        digest.update(code.co_code)
+        digest.update(repr((code.co_consts, code.co_names, texts)).encode())
+    return digest.digest()
+
+_RULES_FINGERPRINT = _rules_fingerprint()
+
+def input_hashes(df, features=()):
+    """Return an int64 hash per row of the columns analysis reads (rule
+    inputs and model features), salted with the rules and the set of columns
+    present, since a missing column means a default rather than a value.
+    """
+    columns = sorted(c for c in set(_RULE_COLUMNS) | set(features) if c in df.columns)
+    X = pd.DataFrame({c: df[c].to_numpy(dtype='float64', na_value=np.nan) for c in columns}, index=range(len(df)))
+    salt = hashlib.sha256(_RULES_FINGERPRINT + ','.join(columns).encode()).digest()
+    hashes = pd.util.hash_pandas_object(X, index=False).to_numpy()
+    return (hashes ^ np.uint64(int.from_bytes(salt[:8], 'little'))).view(np.int64)
+
+def _stored_hashes(column):
+    """Input_Hash values as nullable Int64. Hashes that went through float64
+    (e.g. a CSV with blank cells) have lost precision and count as missing.
+    """
+    values = pd.to_numeric(column, errors='coerce')
+    if values.dtype.kind != 'i':
+        return pd.array([pd.NA] * len(values), dtype='Int64')
+    return pd.array(values, dtype='Int64')
+
+def analyze_data_incremental(df, workers=1):
+    """analyze_data that skips rows analyzed before with the same inputs.
+
+    Rows carry their input hash and the model version they were scored with
+    (Input_Hash, Model_Version); only rows where either changed, or that were
+    never stamped, are re-analyzed (through analyze_data_parallel with the
+    given workers). Returns the analyzed frame and a dict with the number of
+    rows recomputed and reused.
+    """
+    snapshot = _load_model()
+    hashes = input_hashes(df, snapshot.features)
+    version = snapshot.version or ''
+    stale = np.ones(len(df), dtype=bool)
+    if {'Input_Hash', 'Model_Version', 'Recommendation'} <= set(df.columns):
+        fresh_rows = (
+            (_stored_hashes(df['Input_Hash']) == hashes)
+            & (df['Model_Version'].astype('string').array == version)
+            & df['Recommendation'].notna().to_numpy()
+        )
+        stale = ~fresh_rows.fillna(False).to_numpy(dtype=bool)
+
+    result = df.copy()
+    recomputed = int(stale.sum())
+    if recomputed:
+        # Old scores are dropped, so a row whose scoring fails (e.g. a blank
+        # feature) is left without one rather than keeping a stale score
+        fresh = analyze_data_parallel(df[stale].drop(columns=['Risk_Probability'], errors='ignore'), workers=workers)
+        if 'Risk_Probability' in fresh.columns:
+            risk = pd.to_numeric(fresh['Risk_Probability'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            risk = np.full(recomputed, np.nan)
+        # Shards are scored separately, so scoring can fail for some rows
+        # only; Model_Version is stamped on the rows that got a score (or on
+        # all when there is no model), so the others are retried next run.
+        scored = ~np.isnan(risk) if snapshot.model is not None else np.ones(recomputed, dtype=bool)
+        if 'Risk_Probability' in fresh.columns or 'Risk_Probability' in result.columns:
+            result.loc[stale, 'Risk_Probability'] = risk
+        if 'Recommendation' in result.columns and isinstance(result['Recommendation'].dtype, pd.CategoricalDtype):
+            # New texts may not be among the categories read from Parquet
+            result['Recommendation'] = result['Recommendation'].astype(object)
+        result.loc[stale, 'Recommendation'] = fresh['Recommendation'].to_numpy()
+        if 'Model_Version' in result.columns:
+            result['Model_Version'] = result['Model_Version'].astype(object)
+        result.loc[stale, 'Model_Version'] = np.where(scored, version, '')
+        result['Input_Hash'] = hashes
+    return result, {'recomputed': recomputed, 'reused': len(df) - recomputed}
+
+def _output_columns(columns, incremental=False):
+    """The columns analysis writes for input with the given columns: the
+    input's, then the ones analysis adds (Risk_Probability only when a model
+    is loaded), so the layout does not depend on how any one chunk went.
+    """
+    added = ['Risk_Probability'] if _load_model().model is not None else []
+    added.append('Recommendation')
+    if incremental:
+        added += ['Model_Version', 'Input_Hash']
+    columns = list(columns)
+    return columns + [c for c in added if c not in columns]
+
+def analyze_file(input_path, output_path, chunksize=DEFAULT_CHUNK_SIZE, workers=1, incremental=False, stats=None):
+    """Stream input_path through analyze_data in fixed-size chunks.
+
+    Each analyzed chunk is appended to a temporary file that replaces
+    output_path once every chunk is written, so peak memory depends on
+    chunksize rather than file size and a failed run leaves the old output
+    intact. With workers > 1 chunks are analyzed in a process pool, with at
+    most two chunks per worker in flight. With incremental=True chunks go
+    through analyze_data_incremental and, if given, the stats dict is updated
+    with its recomputed/reused counts. Returns the number of rows written.
+    """
+    tmp_path = f"{output_path}.tmp"
+    columns = None
+    rows = 0
+    pool = _process_pool(workers) if workers > 1 else None
+    writer = results_store.ResultsWriter(tmp_path) if _is_parquet(output_path) else None
+    try:
+        chunks = load_data(input_path, chunksize=chunksize)
+        fn = analyze_data_incremental if incremental else analyze_data
+        analyzed = _imap_ordered(pool, fn, chunks, workers * 2) if pool else map(fn, chunks)
+        for chunk in analyzed:
+            if incremental:
+                chunk, counts = chunk
+                if stats is not None:
+                    for key, n in counts.items():
+                        stats[key] = stats.get(key, 0) + n
+            if columns is None:
+                columns = _output_columns(chunk.columns, incremental)
+            # Keep the header layout stable whatever a chunk came back with
+            chunk = chunk.reindex(columns=columns)
+            if writer:
+                writer.write(chunk)
+            else:
+                save_results(chunk, tmp_path, append=rows > 0)
+            rows += len(chunk)
+        if columns is None:
+            # Empty input: still produce a file with the input columns
+            empty = fn(load_data(input_path))
+            empty = empty[0] if incremental else empty
+            if writer:
+                writer.write(empty)
+            else:
+                save_results(empty, tmp_path)
+        if writer:
+            writer.close()
+        os.replace(tmp_path, output_path)
+    finally:
+        if writer:
+            writer.close()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
 
 def plot_stress_distribution(df, save_path):
     plt.figure(figsize=(8, 6))
@@ -161,55 +471,251 @@ def plot_stress_distribution(df, save_path):
 
 _MODEL = None
 _FEATURES = []
+_SCORER = None
 _MODEL_PATH = 'models/risk_model.joblib'
 _FEATURES_PATH = 'models/feature_list.json'
 
-def _load_model():
-    global _MODEL, _FEATURES
-    if _MODEL is not None:
-        return
-    if os.path.exists(_MODEL_PATH):
-        _MODEL = load(_MODEL_PATH)
-        if os.path.exists(_FEATURES_PATH):
+def _sigmoid(z):
+    """1 / (1 + exp(-z)) elementwise, without overflow for large |z|."""
+    e = np.exp(-np.abs(z))
+    return np.where(z >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+class _LinearRiskScorer:
+    """StandardScaler + LogisticRegression folded into a single weight vector.
+
+    predict_proba of such a pipeline is sigmoid(((x - mean) / scale) @ coef + b),
+    which equals sigmoid(x @ w + c) with w = coef / scale and
+    c = b - (mean / scale) @ coef. Scoring is then one dot product on a
+    preallocated per-thread buffer, without building a DataFrame.
+    """
+
+    def __init__(self, features, weights, bias):
+        self.features = list(features)
+        self.weights = weights
+        self.bias = bias
+        self._local = threading.local()
+
+    @classmethod
+    def from_model(cls, model, features):
+        """Return a scorer for a fitted [StandardScaler ->] binary
+        LogisticRegression pipeline, or None for any other model.
+        """
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        steps = [step for _, step in model.steps] if isinstance(model, Pipeline) else [model]
+        clf = steps[-1]
+        if not isinstance(clf, LogisticRegression) or clf.coef_.shape[0] != 1:
+            return None
+        if any(not isinstance(step, StandardScaler) for step in steps[:-1]):
+            return None
+        fitted = list(getattr(model, 'feature_names_in_', []))
+        if fitted and features and fitted != list(features):
+            return None
+        features = fitted or list(features)
+        if len(features) != clf.coef_.shape[1]:
+            return None
+
+        weights = clf.coef_[0].astype('float64')
+        bias = float(clf.intercept_[0])
+        # Fold the scalers in from the classifier backwards
+        for scaler in reversed(steps[:-1]):
+            if scaler.with_std and scaler.scale_ is not None:
+                weights = weights / scaler.scale_
+            if scaler.with_mean and scaler.mean_ is not None:
+                bias -= float(scaler.mean_ @ weights)
+        return cls(features, weights, bias)
+
+    def score_frame(self, df):
+        """Risk probabilities for every row; missing feature columns count as 0
+        and rows with a missing value score NaN.
+        """
+        X = np.zeros((len(df), len(self.features)))
+        for j, c in enumerate(self.features):
+            if c in df.columns:
+                X[:, j] = df[c].to_numpy(dtype='float64', na_value=np.nan)
+        z = X @ self.weights + self.bias
+        # Rows with a blank feature come out as NaN; the others are scored
+        return _sigmoid(z)
+
+    def score_record(self, record):
+        """Risk probability for one submission given as a column -> value mapping."""
+        buf = getattr(self._local, 'buf', None)
+        if buf is None:
+            buf = self._local.buf = np.empty(len(self.features))
+        for j, c in enumerate(self.features):
+            buf[j] = record.get(c, 0)
+        z = float(buf @ self.weights) + self.bias
+        if math.isnan(z):
+            raise ValueError('Input contains NaN')
+        # Only ever exp(-|z|), which cannot overflow
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+# One loaded model artifact; replaced as a whole so readers never see a
+# model paired with another model's feature list or scorer.
+_ModelSnapshot = namedtuple('_ModelSnapshot', ['model', 'features', 'scorer', 'version'])
+_NO_MODEL = _ModelSnapshot(None, [], None, None)
+
+class _ModelRegistry:
+    """Serves the current model and swaps in a new one when train_model.py
+    rewrites the artifacts.
+
+    Checking costs two os.stat calls at most once per check_interval seconds.
+    Only one thread reloads at a time; the others keep scoring with the
+    previous snapshot instead of queueing behind it.
+    """
+
+    def __init__(self, model_path, features_path, check_interval=2.0):
+        self.model_path = model_path
+        self.features_path = features_path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        signature = []
+        for path in (self.model_path, self.features_path):
             try:
-                with open(_FEATURES_PATH, 'r') as f:
-                    data = json.load(f)
-                    _FEATURES = data.get('features', [])
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def current(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        signature = self._stat_signature()
+        if snapshot is not None and signature == self._signature:
+            self._checked_at = now
+            return snapshot
+        # Artifacts changed (or first use): one thread reloads, the rest carry on
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is snapshot:
+                self._reload(signature)
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def _reload(self, signature):
+        self._checked_at = time.monotonic()
+        if signature[0] is None:
+            self._snapshot, self._signature = _NO_MODEL, signature
+            return
+        try:
+            with open(self.model_path, 'rb') as f:
+                version = hashlib.sha256(f.read()).hexdigest()[:12]
+            features = []
+            if signature[1] is not None:
+                try:
+                    with open(self.features_path, 'r') as f:
+                        features = json.load(f).get('features', [])
+                except Exception:
+                    features = []
+            old = self._snapshot
+            if old is not None and old.version == version and old.features == features:
+                # Touched but unchanged: keep the loaded model
+                self._signature = signature
+                return
+            model = load(self.model_path)
+            try:
+                scorer = _LinearRiskScorer.from_model(model, features)
             except Exception:
-                _FEATURES = []
-        else:
-            _FEATURES = []
-    else:
-        _MODEL = None
-        _FEATURES = []
+                scorer = None
+        except Exception:
+            # Likely a half-written artifact; keep serving the old model and
+            # retry on the next check since the signature is not recorded.
+            if self._snapshot is None:
+                self._snapshot = _NO_MODEL
+            return
+        self._snapshot = _ModelSnapshot(model, features, scorer, version)
+        self._signature = signature
+
+_registry = _ModelRegistry(_MODEL_PATH, _FEATURES_PATH)
 
-def _predict_risk(df: pd.DataFrame):
+def _load_model():
+    """Return the current model snapshot, reloading changed artifacts.
+    The _MODEL/_FEATURES/_SCORER globals mirror it for older callers.
+    """
+    global _MODEL, _FEATURES, _SCORER
+    snapshot = _registry.current()
+    _MODEL, _FEATURES, _SCORER = snapshot.model, snapshot.features, snapshot.scorer
+    return snapshot
+
+def _predict_risk(df: pd.DataFrame, snapshot=None):
     """Return risk probabilities for rows in df using trained model.
     If required feature columns are missing, fill with zeros.
     """
-    if _MODEL is None:
+    snapshot = snapshot or _registry.current()
+    model, features, scorer = snapshot.model, snapshot.features, snapshot.scorer
+    if model is None:
         raise RuntimeError('Model not loaded')
-    cols = _FEATURES if _FEATURES else [c for c in ['Stress_Level','Sleep_Hours','Exercise_Hours'] if c in df.columns]
+    if scorer is not None:
+        return scorer.score_frame(df)
+    cols = features if features else [c for c in ['Stress_Level','Sleep_Hours','Exercise_Hours'] if c in df.columns]
     X = df.copy()
     # Ensure columns
     for c in cols:
         if c not in X.columns:
             X[c] = 0
     X = X[cols]
+    # Rows with a blank feature get NaN; only the complete rows are scored
+    complete = X.notna().all(axis=1).to_numpy()
+    proba = np.full(len(X), np.nan)
+    if not complete.any():
+        return proba
+    X = X[complete]
     try:
-        proba = _MODEL.predict_proba(X)[:, 1]
+        proba[complete] = model.predict_proba(X)[:, 1]
     except Exception:
         # If model does not support predict_proba, fallback to decision_function if available
-        if hasattr(_MODEL, 'decision_function'):
+        if hasattr(model, 'decision_function'):
             from sklearn.preprocessing import MinMaxScaler
-            scores = _MODEL.decision_function(X).reshape(-1, 1)
+            scores = model.decision_function(X).reshape(-1, 1)
             scaler = MinMaxScaler()
-            proba = scaler.fit_transform(scores).ravel()
+            proba[complete] = scaler.fit_transform(scores).ravel()
         else:
             # Last resort: zeros
-            proba = [0.0] * len(X)
+            proba[complete] = 0.0
     return proba
 
+def predict_risk_single(record):
+    """Return the risk probability for one survey submission (a dict of
+    column -> value), or None when no model is available.
+    """
+    snapshot = _registry.current()
+    if snapshot.model is None:
+        return None
+    if snapshot.scorer is not None:
+        return snapshot.scorer.score_record(record)
+    return float(_predict_risk(pd.DataFrame([record]), snapshot)[0])
+
+def analyze_record(record):
+    """analyze_data for a single submission, without building a DataFrame.
+    Returns a copy of record with Risk_Probability (if a model is available)
+    and Recommendation added.
+    """
+    result = dict(record)
+    try:
+        risk = predict_risk_single(record)
+        if risk is not None:
+            result['Risk_Probability'] = risk
+    except Exception:
+        # Same resilience as analyze_data: recommendations still work without a model
+        pass
+    result['Recommendation'] = generate_recommendation(record)
+    return result
+
 def plot_sleep_distribution(df, save_path):
     plt.figure(figsize=(8, 6))
     sns.histplot(df['Sleep_Hours'], bins=10, kde=True)
@@ -228,3 +734,23 @@ def plot_recommendation_summary(df, save_path):
     plt.ylabel('Recommendation')
     plt.savefig(save_path)
     plt.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score and add recommendations to survey data in fixed-size chunks.")
+    parser.add_argument("input", help="survey CSV or Parquet file to analyze")
+    parser.add_argument("output", nargs="?", default=results_store.RESULTS_PATH, help="where to write the results (.csv or .parquet)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE, help="rows processed per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 = one per CPU)")
+    parser.add_argument("--incremental", action="store_true", help="only re-analyze rows whose inputs or model changed")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    stats = {}
+    rows = analyze_file(args.input, args.output, chunksize=args.chunksize, workers=workers, incremental=args.incremental, stats=stats)
+    print(f"Analyzed {rows} rows from {args.input} into {args.output}")
+    if args.incremental:
+        print(f"Recomputed {stats.get('recomputed', 0)} rows, reused {stats.get('reused', 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,90 +1,190 @@
 # Simple user management and session persistence fix
 import streamlit as st
 import pandas as pd
-from analysis import load_data, analyze_data, save_results, plot_stress_distribution, plot_sleep_distribution, plot_recommendation_summary
-from chatbot import chatbot
+from analysis import load_data, analyze_data, analyze_data_incremental, analyze_record, plot_stress_distribution, plot_sleep_distribution, plot_recommendation_summary
+from chatbot import chatbot, warm_up_in_background
+from results_store import PAGE_SORTS, ResultsChanged, append_submission, apply_edits, cached_results, latest_submission, results_page, snapshot_results, write_results
+from session_store import issue_token, needs_refresh, revoke_token, verify_token
+from user_store import count_users, create_user, delete_user, find_users, get_user, update_user
 import os
-import json
 import random
-import hashlib
-import time
-
-# Session persistence functions
-def generate_session_token(username, password):
-    """Generate a secure session token"""
-    timestamp = str(time.time())
-    token_data = f"{username}:{password}:{timestamp}"
-    return hashlib.sha256(token_data.encode()).hexdigest()[:16]
 
+# Session persistence: a signed token in the URL (see session_store)
 def get_session_from_url():
-    """Check for existing session in URL parameters"""
+    """Check for an existing session in the URL parameters"""
     try:
-        query_params = st.query_params
-        if 'user' in query_params and 'token' in query_params:
-            username = query_params['user']
-            token = query_params['token']
-            if username in users and users[username].get('session_token') == token:
-                # Check if token is not too old (24 hours)
-                token_time = users[username].get('token_timestamp', 0)
-                if time.time() - token_time < 86400:  # 24 hours
-                    return username, users[username].get('is_admin', False), users[username].get('is_super_admin', False)
+        username = st.query_params.get('user')
+        token = st.query_params.get('token')
+        if username and token:
+            account = get_user(username)
+            if verify_token(username, token, account):
+                return username, account['is_admin'], account['is_super_admin']
     except:
         pass
     return None, False, False
 
-def update_session_url(username, is_admin, is_super_admin):
-    token = generate_session_token(username, users[username]['password'])
-    users[username]['session_token'] = token
-    users[username]['token_timestamp'] = time.time()
-
-    # Update query parameters
+def start_session(username):
+    """Put a new session token for username in the URL"""
     try:
-        st.query_params['user'] = username
-        st.query_params['token'] = token
+        account = get_user(username)
+        if account:
+            st.query_params['user'] = username
+            st.query_params['token'] = issue_token(username, account['password'])
     except:
         pass
 
-def save_session_state(username, is_admin, is_super_admin):
-    """Save session state to a persistent file"""
-    session_data = {
-        'username': username,
-        'is_admin': is_admin,
-        'is_super_admin': is_super_admin,
-        'timestamp': time.time()
-    }
+def end_session():
+    """Revoke the URL's session token and clear it"""
     try:
-        with open(f'session_{username}.json', 'w') as f:
-            json.dump(session_data, f)
+        token = st.query_params.get('token')
+        if token:
+            revoke_token(token)
+        st.query_params.clear()
     except:
         pass
 
-def load_session_state():
-    """Load session state from persistent file"""
-    try:
-        # Look for any session files
-        import glob
-        session_files = glob.glob('session_*.json')
-        for session_file in session_files:
-            if os.path.exists(session_file):
-                with open(session_file, 'r') as f:
-                    session_data = json.load(f)
-                    # Check if session is not too old (24 hours)
-                    if time.time() - session_data.get('timestamp', 0) < 86400:
-                        username = session_data['username']
-                        if username in users:
-                            return username, session_data.get('is_admin', False), session_data.get('is_super_admin', False)
-    except:
-        pass
-    return None, False, False
+# Columns of the admin response editor
+RESPONSE_COLUMN_CONFIG = {
+    "Username": st.column_config.TextColumn("Username", width="medium"),
+    "Name": st.column_config.TextColumn("Name", width="medium"),
+    "Age": st.column_config.NumberColumn("Age", min_value=10, max_value=100),
+    "Stress_Level": st.column_config.NumberColumn("Stress Level", min_value=1, max_value=10),
+    "Sleep_Hours": st.column_config.NumberColumn("Sleep Hours", min_value=0.0, max_value=24.0),
+    "Exercise_Hours": st.column_config.NumberColumn("Exercise Hours", min_value=0.0, max_value=168.0),
+    "Academic_Workload": st.column_config.NumberColumn("Academic Workload", min_value=1, max_value=10),
+    "Anxiety_Level": st.column_config.NumberColumn("Anxiety Level", min_value=1, max_value=10),
+    "Depression_Level": st.column_config.NumberColumn("Depression Level", min_value=1, max_value=10),
+    "Social_Support": st.column_config.NumberColumn("Social Support", min_value=1, max_value=10),
+    "Financial_Stress": st.column_config.NumberColumn("Financial Stress", min_value=1, max_value=10),
+    "Relationship_Stress": st.column_config.NumberColumn("Relationship Stress", min_value=1, max_value=10),
+    "Coping_Frequency": st.column_config.NumberColumn("Coping Frequency", min_value=1, max_value=10),
+    "Screen_Time": st.column_config.NumberColumn("Screen Time", min_value=1, max_value=10),
+    "Nutrition_Quality": st.column_config.NumberColumn("Nutrition Quality", min_value=1, max_value=10),
+    "Self_Esteem": st.column_config.NumberColumn("Self Esteem", min_value=1, max_value=10),
+    "Work_Life_Balance": st.column_config.NumberColumn("Work Life Balance", min_value=1, max_value=10),
+    "Future_Optimism": st.column_config.NumberColumn("Future Optimism", min_value=1, max_value=10),
+    "Recommendation": st.column_config.TextColumn("Recommendation", width="large"),
+    # Bookkeeping for incremental re-analysis
+    "Input_Hash": None,
+    "Model_Version": None,
+}
+
+# Accounts listed per page on the Manage Admins / Manage Users pages
+ACCOUNTS_PAGE_SIZE = 50
+
+def accounts_page(key, is_admin, is_super_admin=None):
+    """The page of accounts with the given role flags picked by the page
+    input under session state key, with the number of accounts and pages
+    """
+    total = count_users(is_admin=is_admin, is_super_admin=is_super_admin)
+    pages = max(1, -(-total // ACCOUNTS_PAGE_SIZE))
+    # The picked page may be past the end after accounts were removed
+    page = min(st.session_state.get(key, 1), pages)
+    st.session_state[key] = page
+    users = find_users(is_admin=is_admin, is_super_admin=is_super_admin,
+                       offset=(page - 1) * ACCOUNTS_PAGE_SIZE, limit=ACCOUNTS_PAGE_SIZE)
+    return users, total, pages
+
+def first_responses_page():
+    st.session_state.responses_page = 1
+
+def show_student_responses():
+    """The admin page of survey responses, one page of rows at a time"""
+    st.subheader("Student Survey Responses")
+
+    # Filtering, sorting and paging happen here; only the page's rows are
+    # copied out and sent to the browser
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        username_filter = st.text_input("Filter by username", key="responses_filter", on_change=first_responses_page).strip()
+    with col2:
+        sort = st.selectbox("Sort by", list(PAGE_SORTS), key="responses_sort", on_change=first_responses_page)
+    with col3:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="responses_page_size", on_change=first_responses_page)
+    page_number = st.session_state.get("responses_page", 1)
+    page = results_page(page_number, page_size, username_filter, sort)
+    df = page.frame
+    # Plain text so the editor offers free-form editing, not a category picker
+    if 'Recommendation' in df.columns:
+        df['Recommendation'] = df['Recommendation'].astype('string')
+
+    # Select relevant columns for display
+    display_cols = ['Username', 'Name', 'Age', 'Stress_Level', 'Sleep_Hours', 'Exercise_Hours', 'Recommendation']
+    # Include model risk if available
+    if 'Risk_Probability' in df.columns:
+        display_cols.insert(6, 'Risk_Probability')
+    if 'Academic_Workload' in df.columns:
+        display_cols.extend(['Academic_Workload', 'Anxiety_Level', 'Depression_Level', 'Social_Support'])
+
+    if page.total:
+        st.dataframe(df[[c for c in display_cols if c in df.columns]])
+        # The requested page may be past the end after rows were removed
+        st.session_state.responses_page = page.page
+        st.number_input(f"Page (of {page.pages:,}; {page.total:,} responses)", min_value=1, max_value=page.pages,
+                        key="responses_page")
+    elif username_filter:
+        st.info("No responses match this username.")
+    else:
+        st.info("No student responses available yet. You can add new responses below.")
+
+    st.subheader("Edit/Add Responses")
+    st.info("You can edit the responses on this page or add new ones directly in the table below. Click 'Save Changes' to update the data.")
+
+    # Create editable dataframe (always show, even if empty). Its edits refer
+    # to rows of this page, so each page gets its own editor.
+    editor_key = f"responses_editor:{username_filter}:{sort}:{page_size}:{page.page}"
+    st.data_editor(
+        df,
+        column_config=RESPONSE_COLUMN_CONFIG,
+        hide_index=True,
+        use_container_width=True,
+        num_rows="dynamic",  # Allow adding new rows
+        key=editor_key
+    )
+
+    if st.button("Save Changes", type="primary"):
+        try:
+            # Empty added rows are skipped
+            apply_edits(page.positions, st.session_state[editor_key])
+            st.success("Changes saved successfully!")
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error saving changes: {str(e)}")
+
+    if page.total and st.button("Re-run Analysis"):
+        try:
+            # Only responses whose answers or the model changed are recomputed;
+            # submissions that arrive meanwhile are kept
+            results, version = snapshot_results()
+            reanalyzed_df, counts = analyze_data_incremental(results, workers=None)
+            write_results(reanalyzed_df, based_on=version)
+            st.success(f"Re-analyzed {counts['recomputed']} responses ({counts['reused']} unchanged).")
+        except ResultsChanged:
+            st.warning("The responses were changed while the analysis ran. Please run it again.")
+        except Exception as e:
+            st.error(f"Error re-running analysis: {str(e)}")
+
+    # Download options; the files are built from every response, and only
+    # when a button is clicked
+    if page.total:
+        st.subheader("Download Data")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download as CSV", lambda: cached_results().to_csv(index=False),
+                               file_name="student_responses.csv", mime="text/csv")
+        with col2:
+            def excel_data():
+                # For Excel, need to use BytesIO
+                from io import BytesIO
+                buffer = BytesIO()
+                cached_results().to_excel(buffer, index=False, engine='openpyxl')
+                return buffer.getvalue()
+            st.download_button("Download as Excel", excel_data, file_name="student_responses.xlsx", mime="application/vnd.openpyxlformats-officedocument.spreadsheetml.sheet")
+    else:
+        st.info("Add some responses above to enable download options.")
 
-def clear_session_state(username):
-    """Clear session state file"""
-    try:
-        session_file = f'session_{username}.json'
-        if os.path.exists(session_file):
-            os.remove(session_file)
-    except:
-        pass
+# Load the chatbot's NLP data while the first page renders (once per process)
+warm_up_in_background()
 
 st.title("A Data-Driven Mental Health Monitoring and Recommendation System for Students")
 
@@ -191,59 +291,7 @@ st.markdown("""
 
 st.markdown('<div class="main-header">Mental Health Monitoring & Recommendation System</div>', unsafe_allow_html=True)
 
-# Simple user management
-if os.path.exists('users.json'):
-    with open('users.json', 'r') as f:
-        raw_users = json.load(f)
-    users = {}
-    for k, v in raw_users.items():
-        if isinstance(v, str):
-            users[k] = {"password": v, "is_admin": False, "security_question": "", "security_answer": "", "is_super_admin": False}
-        else:
-            users[k] = v
-            if 'security_question' not in users[k]:
-                users[k]['security_question'] = ""
-            if 'security_answer' not in users[k]:
-                users[k]['security_answer'] = ""
-            if 'is_super_admin' not in users[k]:
-                users[k]['is_super_admin'] = False
-else:
-    users = {"student": {"password": "pass", "is_admin": False, "security_question": "", "security_answer": "", "is_super_admin": False}, "Sujith": {"password": "Sujith@123", "is_admin": False, "is_super_admin": True, "security_question": "", "security_answer": ""}}
-
-if 'users' not in st.session_state:
-    st.session_state.users = users
-
-# Enhanced session persistence - using session state with backup
-def get_session_from_url():
-    """Check for existing session in URL parameters"""
-    try:
-        query_params = st.query_params
-        if 'user' in query_params and 'token' in query_params:
-            username = query_params['user']
-            token = query_params['token']
-            if username in users and users[username].get('session_token') == token:
-                # Check if token is not too old (24 hours)
-                token_time = users[username].get('token_timestamp', 0)
-                if time.time() - token_time < 86400:  # 24 hours
-                    return username, users[username].get('is_admin', False), users[username].get('is_super_admin', False)
-    except:
-        pass
-    return None, False, False
-
-def update_session_url(username, is_admin, is_super_admin):
-    """Update URL with session information"""
-    token = generate_session_token(username, users[username]['password'])
-    users[username]['session_token'] = token
-    users[username]['token_timestamp'] = time.time()
-
-    # Update query parameters
-    try:
-        st.query_params['user'] = username
-        st.query_params['token'] = token
-    except:
-        pass
-
-# Initialize session state with file-based persistence and URL fallback
+# Initialize session state, restoring a login from the URL
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
 
@@ -256,31 +304,17 @@ if 'is_admin' not in st.session_state:
 if 'is_super_admin' not in st.session_state:
     st.session_state.is_super_admin = False
 
-# Check for existing session from file first, then URL
-file_user, file_is_admin, file_is_super_admin = load_session_state()
-url_user, url_is_admin, url_is_super_admin = get_session_from_url()
-
-# Use file session if available, otherwise use URL session
-if file_user and not st.session_state.logged_in:
-    st.session_state.logged_in = True
-    st.session_state.current_user = file_user
-    st.session_state.is_admin = file_is_admin
-    st.session_state.is_super_admin = file_is_super_admin
-    # Update URL for consistency
-    update_session_url(file_user, file_is_admin, file_is_super_admin)
-elif url_user and not st.session_state.logged_in:
-    st.session_state.logged_in = True
-    st.session_state.current_user = url_user
-    st.session_state.is_admin = url_is_admin
-    st.session_state.is_super_admin = url_is_super_admin
-    # Save to file for persistence
-    save_session_state(url_user, url_is_admin, url_is_super_admin)
-    # Update URL to ensure persistence
-    update_session_url(url_user, url_is_admin, url_is_super_admin)
-elif st.session_state.current_user and st.session_state.logged_in:
-    # Session exists in memory, ensure both file and URL are updated
-    save_session_state(st.session_state.current_user, st.session_state.is_admin, st.session_state.is_super_admin)
-    update_session_url(st.session_state.current_user, st.session_state.is_admin, st.session_state.is_super_admin)
+# Restore a login from the URL's session token; a rerun of a logged-in
+# session only renews the token once it is half way to expiring
+if not st.session_state.logged_in:
+    url_user, url_is_admin, url_is_super_admin = get_session_from_url()
+    if url_user:
+        st.session_state.logged_in = True
+        st.session_state.current_user = url_user
+        st.session_state.is_admin = url_is_admin
+        st.session_state.is_super_admin = url_is_super_admin
+elif needs_refresh(st.query_params.get('token')):
+    start_session(st.session_state.current_user)
 
 if not st.session_state.logged_in:
     tab1, tab2, tab3, tab4 = st.tabs(["User Login", "Admin Login", "Super Admin Login", "Register"])
@@ -291,15 +325,14 @@ if not st.session_state.logged_in:
             username = st.text_input("Username", key="login_user")
             password = st.text_input("Password", type="password", key="login_pass")
             if st.form_submit_button("Login"):
-                if username in st.session_state.users and st.session_state.users[username]["password"] == password:
+                account = get_user(username)
+                if account and account["password"] == password:
                     st.session_state.logged_in = True
                     st.session_state.current_user = username
-                    st.session_state.is_admin = st.session_state.users[username]["is_admin"]
-                    st.session_state.is_super_admin = st.session_state.users[username].get("is_super_admin", False)
-                    # Save session state for persistence across browser refreshes
-                    save_session_state(username, st.session_state.is_admin, st.session_state.is_super_admin)
-                    # Update URL with session info for additional persistence
-                    update_session_url(username, st.session_state.is_admin, st.session_state.is_super_admin)
+                    st.session_state.is_admin = account["is_admin"]
+                    st.session_state.is_super_admin = account["is_super_admin"]
+                    # Keep the login across browser refreshes
+                    start_session(username)
                     st.success("Login successful!")
                     st.rerun()
                 else:
@@ -308,8 +341,9 @@ if not st.session_state.logged_in:
         with st.expander("Forgot Password?"):
             forgot_user = st.text_input("Enter your username", key="forgot_username")
             if st.button("Reset Password"):
-                if forgot_user in st.session_state.users:
-                    if st.session_state.users[forgot_user]["security_question"]:
+                forgot_account = get_user(forgot_user)
+                if forgot_account:
+                    if forgot_account["security_question"]:
                         st.session_state.forgot_user = forgot_user
                         st.session_state.forgot_step = "question"
                         st.rerun()
@@ -320,11 +354,12 @@ if not st.session_state.logged_in:
         
         if 'forgot_step' in st.session_state and st.session_state.forgot_step == "question":
             st.subheader("Security Question")
-            question = st.session_state.users[st.session_state.forgot_user]["security_question"]
+            forgot_account = get_user(st.session_state.forgot_user) or {"security_question": "", "security_answer": None}
+            question = forgot_account["security_question"]
             st.write(question)
             answer = st.text_input("Your answer", key="forgot_answer")
             if st.button("Submit Answer"):
-                if answer.lower() == st.session_state.users[st.session_state.forgot_user]["security_answer"]:
+                if answer.lower() == forgot_account["security_answer"]:
                     st.session_state.forgot_step = "new_password"
                     st.rerun()
                 else:
@@ -336,9 +371,7 @@ if not st.session_state.logged_in:
             confirm_pass = st.text_input("Confirm New Password", type="password", key="forgot_confirm_pass")
             if st.button("Update Password"):
                 if new_pass == confirm_pass and len(new_pass) >= 4:
-                    st.session_state.users[st.session_state.forgot_user]["password"] = new_pass
-                    with open('users.json', 'w') as f:
-                        json.dump(st.session_state.users, f)
+                    update_user(st.session_state.forgot_user, password=new_pass)
                     st.success("Password updated successfully!")
                     del st.session_state.forgot_step
                     del st.session_state.forgot_user
@@ -351,15 +384,14 @@ if not st.session_state.logged_in:
             admin_username = st.text_input("Admin Username", key="admin_login_user")
             admin_password = st.text_input("Password", type="password", key="admin_login_pass")
             if st.form_submit_button("Admin Login"):
-                if admin_username in st.session_state.users and st.session_state.users[admin_username]["password"] == admin_password and st.session_state.users[admin_username].get("is_admin", False):
+                account = get_user(admin_username)
+                if account and account["password"] == admin_password and account["is_admin"]:
                     st.session_state.logged_in = True
                     st.session_state.current_user = admin_username
                     st.session_state.is_admin = True
                     st.session_state.is_super_admin = False
-                    # Save session state for persistence across browser refreshes
-                    save_session_state(admin_username, True, False)
-                    # Update URL with session info for additional persistence
-                    update_session_url(admin_username, True, False)
+                    # Keep the login across browser refreshes
+                    start_session(admin_username)
                     st.success("Admin login successful!")
                     st.rerun()
                 else:
@@ -371,15 +403,14 @@ if not st.session_state.logged_in:
             super_username = st.text_input("Super Admin Username", key="super_login_user")
             super_password = st.text_input("Password", type="password", key="super_login_pass")
             if st.form_submit_button("Super Admin Login"):
-                if super_username in st.session_state.users and st.session_state.users[super_username]["password"] == super_password and st.session_state.users[super_username].get("is_super_admin", False):
+                account = get_user(super_username)
+                if account and account["password"] == super_password and account["is_super_admin"]:
                     st.session_state.logged_in = True
                     st.session_state.current_user = super_username
                     st.session_state.is_admin = False
                     st.session_state.is_super_admin = True
-                    # Save session state for persistence across browser refreshes
-                    save_session_state(super_username, False, True)
-                    # Update URL with session info for additional persistence
-                    update_session_url(super_username, False, True)
+                    # Keep the login across browser refreshes
+                    start_session(super_username)
                     st.success("Super Admin login successful!")
                     st.rerun()
                 else:
@@ -404,7 +435,7 @@ if not st.session_state.logged_in:
             security_answer = st.text_input("Security Answer", key="reg_security_answer")
             
             if st.form_submit_button("Register"):
-                if new_user in st.session_state.users:
+                if get_user(new_user):
                     st.error("Username already exists")
                 elif new_pass != confirm_pass:
                     st.error("Passwords do not match")
@@ -414,16 +445,13 @@ if not st.session_state.logged_in:
                     st.error("Please enter your custom security question")
                 elif not security_answer:
                     st.error("Please provide a security answer")
+                elif not create_user(new_user, {"password": new_pass, "is_admin": False, "is_super_admin": False, "security_question": security_question, "security_answer": security_answer.lower()}):
+                    st.error("Username already exists")
                 else:
-                    st.session_state.users[new_user] = {"password": new_pass, "is_admin": False, "is_super_admin": False, "security_question": security_question, "security_answer": security_answer.lower()}
-                    with open('users.json', 'w') as f:
-                        json.dump(st.session_state.users, f)
                     st.session_state.logged_in = True
                     st.session_state.current_user = new_user
-                    # Save session state for persistence across browser refreshes
-                    save_session_state(new_user, False, False)
-                    # Update URL with session info for additional persistence
-                    update_session_url(new_user, False, False)
+                    # Keep the login across browser refreshes
+                    start_session(new_user)
                     st.success("Registration successful! Welcome!")
                     st.rerun()
 
@@ -432,19 +460,7 @@ else:
         st.sidebar.write(f"Super Admin: {st.session_state.current_user}")
         if st.sidebar.button("Logout"):
             st.session_state.logged_in = False
-            # Clear session from users data
-            if st.session_state.current_user in users:
-                users[st.session_state.current_user].pop('session_token', None)
-                users[st.session_state.current_user].pop('token_timestamp', None)
-                with open('users.json', 'w') as f:
-                    json.dump(users, f)
-            # Clear session state file
-            clear_session_state(st.session_state.current_user)
-            # Clear URL parameters
-            try:
-                st.query_params.clear()
-            except:
-                pass
+            end_session()
             st.rerun()
         
         # Add daily mood check-in and mental health tips in sidebar
@@ -514,112 +530,13 @@ else:
         option = st.sidebar.selectbox("Super Admin Options", ["Manage Admins", "Manage Users", "View Student Responses"])
         
         if option == "View Student Responses":
-            st.subheader("Student Survey Responses")
-            
-            # Load existing data or create empty dataframe
-            if os.path.exists("student_survey_results.csv"):
-                df = pd.read_csv("student_survey_results.csv")
-            else:
-                # Create empty dataframe with proper columns and dtypes
-                df = pd.DataFrame({
-                    "Username": pd.Series(dtype="string"),
-                    "Name": pd.Series(dtype="string"),
-                    "Age": pd.Series(dtype="int64"),
-                    "Stress_Level": pd.Series(dtype="int64"),
-                    "Sleep_Hours": pd.Series(dtype="float64"),
-                    "Exercise_Hours": pd.Series(dtype="float64"),
-                    "Academic_Workload": pd.Series(dtype="int64"),
-                    "Anxiety_Level": pd.Series(dtype="int64"),
-                    "Social_Support": pd.Series(dtype="int64"),
-                    "Depression_Level": pd.Series(dtype="int64"),
-                    "Financial_Stress": pd.Series(dtype="int64"),
-                    "Relationship_Stress": pd.Series(dtype="int64"),
-                    "Coping_Frequency": pd.Series(dtype="int64"),
-                    "Screen_Time": pd.Series(dtype="int64"),
-                    "Nutrition_Quality": pd.Series(dtype="int64"),
-                    "Self_Esteem": pd.Series(dtype="int64"),
-                    "Work_Life_Balance": pd.Series(dtype="int64"),
-                    "Future_Optimism": pd.Series(dtype="int64"),
-                    "Recommendation": pd.Series(dtype="string")
-                })
-            
-            # Select relevant columns for display
-            display_cols = ['Username', 'Name', 'Age', 'Stress_Level', 'Sleep_Hours', 'Exercise_Hours', 'Recommendation']
-            # Include model risk if available
-            if 'Risk_Probability' in df.columns:
-                display_cols.insert(6, 'Risk_Probability')
-            if 'Academic_Workload' in df.columns:
-                display_cols.extend(['Academic_Workload', 'Anxiety_Level', 'Depression_Level', 'Social_Support'])
-            
-            if not df.empty:
-                st.dataframe(df[display_cols])
-            else:
-                st.info("No student responses available yet. You can add new responses below.")
-            
-            st.subheader("Edit/Add Responses")
-            st.info("You can edit existing responses or add new ones directly in the table below. Click 'Save Changes' to update the data.")
-            
-            # Create editable dataframe (always show, even if empty)
-            edited_df = st.data_editor(
-                df,
-                column_config={
-                    "Username": st.column_config.TextColumn("Username", width="medium"),
-                    "Name": st.column_config.TextColumn("Name", width="medium"),
-                    "Age": st.column_config.NumberColumn("Age", min_value=10, max_value=100),
-                    "Stress_Level": st.column_config.NumberColumn("Stress Level", min_value=1, max_value=10),
-                    "Sleep_Hours": st.column_config.NumberColumn("Sleep Hours", min_value=0.0, max_value=24.0),
-                    "Exercise_Hours": st.column_config.NumberColumn("Exercise Hours", min_value=0.0, max_value=168.0),
-                    "Academic_Workload": st.column_config.NumberColumn("Academic Workload", min_value=1, max_value=10),
-                    "Anxiety_Level": st.column_config.NumberColumn("Anxiety Level", min_value=1, max_value=10),
-                    "Depression_Level": st.column_config.NumberColumn("Depression Level", min_value=1, max_value=10),
-                    "Social_Support": st.column_config.NumberColumn("Social Support", min_value=1, max_value=10),
-                    "Financial_Stress": st.column_config.NumberColumn("Financial Stress", min_value=1, max_value=10),
-                    "Relationship_Stress": st.column_config.NumberColumn("Relationship Stress", min_value=1, max_value=10),
-                    "Coping_Frequency": st.column_config.NumberColumn("Coping Frequency", min_value=1, max_value=10),
-                    "Screen_Time": st.column_config.NumberColumn("Screen Time", min_value=1, max_value=10),
-                    "Nutrition_Quality": st.column_config.NumberColumn("Nutrition Quality", min_value=1, max_value=10),
-                    "Self_Esteem": st.column_config.NumberColumn("Self Esteem", min_value=1, max_value=10),
-                    "Work_Life_Balance": st.column_config.NumberColumn("Work Life Balance", min_value=1, max_value=10),
-                    "Future_Optimism": st.column_config.NumberColumn("Future Optimism", min_value=1, max_value=10),
-                    "Recommendation": st.column_config.TextColumn("Recommendation", width="large"),
-                },
-                hide_index=True,
-                use_container_width=True,
-                num_rows="dynamic"  # Allow adding new rows
-            )
-            
-            if st.button("Save Changes", type="primary"):
-                try:
-                    # Remove empty rows before saving
-                    edited_df = edited_df.dropna(how='all')
-                    edited_df.to_csv("student_survey_results.csv", index=False)
-                    st.success("Changes saved successfully!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error saving changes: {str(e)}")
-            
-            # Download options
-            if not df.empty:
-                st.subheader("Download Data")
-                col1, col2 = st.columns(2)
-                with col1:
-                    csv_data = df.to_csv(index=False)
-                    st.download_button("Download as CSV", csv_data, file_name="student_responses.csv", mime="text/csv")
-                with col2:
-                    # For Excel, need to use BytesIO
-                    from io import BytesIO
-                    buffer = BytesIO()
-                    df.to_excel(buffer, index=False, engine='openpyxl')
-                    buffer.seek(0)
-                    st.download_button("Download as Excel", buffer, file_name="student_responses.xlsx", mime="application/vnd.openpyxlformats-officedocument.spreadsheetml.sheet")
-            else:
-                st.info("Add some responses above to enable download options.")
+            show_student_responses()
         
         elif option == "Manage Admins":
             st.subheader("Admin User Management")
             
-            # List all admin users
-            admin_users = {k: v for k, v in st.session_state.users.items() if v.get('is_admin', False)}
+            # List admin users, a page at a time
+            admin_users, admin_total, admin_pages = accounts_page("admins_page", is_admin=True)
             if admin_users:
                 st.write("Current Admin Users:")
                 for username, data in admin_users.items():
@@ -633,16 +550,17 @@ else:
                     with col3:
                         if st.button(f"Delete {username}", key=f"delete_{username}"):
                             # Remove admin status
-                            st.session_state.users[username]['is_admin'] = False
-                            with open('users.json', 'w') as f:
-                                json.dump(st.session_state.users, f)
+                            update_user(username, is_admin=False)
                             st.success(f"Admin privileges removed from '{username}'")
                             st.rerun()
+                if admin_pages > 1:
+                    st.number_input(f"Page (of {admin_pages:,}; {admin_total:,} admins)", min_value=1,
+                                    max_value=admin_pages, key="admins_page")
             else:
                 st.info("No admin users found.")
             
             # Edit admin section
-            if 'edit_admin' in st.session_state and st.session_state.edit_admin in st.session_state.users:
+            if 'edit_admin' in st.session_state and get_user(st.session_state.edit_admin):
                 edit_user = st.session_state.edit_admin
                 st.subheader(f"Edit Admin: {edit_user}")
                 
@@ -653,9 +571,7 @@ else:
                 with col1:
                     if st.button("Update Password"):
                         if new_password == confirm_password and len(new_password) >= 4:
-                            st.session_state.users[edit_user]['password'] = new_password
-                            with open('users.json', 'w') as f:
-                                json.dump(st.session_state.users, f)
+                            update_user(edit_user, password=new_password)
                             st.success(f"Password updated for '{edit_user}'")
                             del st.session_state.edit_admin
                             st.rerun()
@@ -672,21 +588,18 @@ else:
             new_admin_user = st.text_input("New Admin Username", key="new_admin_user")
             new_admin_pass = st.text_input("New Admin Password", type="password", key="new_admin_pass")
             if st.button("Create Admin"):
-                if new_admin_user in st.session_state.users:
-                    st.error("Username already exists")
-                elif len(new_admin_pass) < 4:
+                if len(new_admin_pass) < 4:
                     st.error("Password must be at least 4 characters")
+                elif not create_user(new_admin_user, {"password": new_admin_pass, "is_admin": True, "is_super_admin": False, "security_question": "", "security_answer": ""}):
+                    st.error("Username already exists")
                 else:
-                    st.session_state.users[new_admin_user] = {"password": new_admin_pass, "is_admin": True, "is_super_admin": False, "security_question": "", "security_answer": ""}
-                    with open('users.json', 'w') as f:
-                        json.dump(st.session_state.users, f)
                     st.success(f"Admin user '{new_admin_user}' created successfully!")
         
         elif option == "Manage Users":
             st.subheader("User Management")
             
-            # List all regular users (not admins or super admins)
-            regular_users = {k: v for k, v in st.session_state.users.items() if not v.get('is_admin', False) and not v.get('is_super_admin', False)}
+            # List regular users (not admins or super admins), a page at a time
+            regular_users, user_total, user_pages = accounts_page("users_page", is_admin=False, is_super_admin=False)
             
             if regular_users:
                 st.write("Current Users:")
@@ -696,11 +609,12 @@ else:
                         st.write(f"{username}")
                     with col2:
                         if st.button(f"Remove {username}", key=f"remove_user_{username}"):
-                            del st.session_state.users[username]
-                            with open('users.json', 'w') as f:
-                                json.dump(st.session_state.users, f)
+                            delete_user(username)
                             st.success(f"User '{username}' removed successfully!")
                             st.rerun()
+                if user_pages > 1:
+                    st.number_input(f"Page (of {user_pages:,}; {user_total:,} users)", min_value=1,
+                                    max_value=user_pages, key="users_page")
             else:
                 st.info("No regular users found.")
             
@@ -709,33 +623,18 @@ else:
             new_username = st.text_input("New Username", key="new_user_username")
             new_user_pass = st.text_input("New Password", type="password", key="new_user_pass")
             if st.button("Create User"):
-                if new_username in st.session_state.users:
-                    st.error("Username already exists")
-                elif len(new_user_pass) < 4:
+                if len(new_user_pass) < 4:
                     st.error("Password must be at least 4 characters")
+                elif not create_user(new_username, {"password": new_user_pass, "is_admin": False, "is_super_admin": False, "security_question": "", "security_answer": ""}):
+                    st.error("Username already exists")
                 else:
-                    st.session_state.users[new_username] = {"password": new_user_pass, "is_admin": False, "is_super_admin": False, "security_question": "", "security_answer": ""}
-                    with open('users.json', 'w') as f:
-                        json.dump(st.session_state.users, f)
                     st.success(f"User '{new_username}' created successfully!")
         
     elif st.session_state.get('is_admin', False):
         st.sidebar.write(f"Admin: {st.session_state.current_user}")
         if st.sidebar.button("Logout"):
             st.session_state.logged_in = False
-            # Clear session from users data
-            if st.session_state.current_user in users:
-                users[st.session_state.current_user].pop('session_token', None)
-                users[st.session_state.current_user].pop('token_timestamp', None)
-                with open('users.json', 'w') as f:
-                    json.dump(users, f)
-            # Clear session state file
-            clear_session_state(st.session_state.current_user)
-            # Clear URL parameters
-            try:
-                st.query_params.clear()
-            except:
-                pass
+            end_session()
             st.rerun()
         
         # Add daily mood check-in and mental health tips in sidebar
@@ -805,126 +704,12 @@ else:
         option = st.sidebar.selectbox("Admin Options", ["View Student Responses"])
         
         if option == "View Student Responses":
-            st.subheader("Student Survey Responses")
-            
-            # Load existing data or create empty dataframe
-            if os.path.exists("student_survey_results.csv"):
-                df = pd.read_csv("student_survey_results.csv")
-                # Ensure Name column is string type for data_editor compatibility
-                if 'Name' in df.columns:
-                    df['Name'] = df['Name'].astype(str)
-            else:
-                # Create empty dataframe with proper columns and dtypes
-                df = pd.DataFrame({
-                    "Username": pd.Series(dtype="string"),
-                    "Name": pd.Series(dtype="string"),
-                    "Age": pd.Series(dtype="int64"),
-                    "Stress_Level": pd.Series(dtype="int64"),
-                    "Sleep_Hours": pd.Series(dtype="float64"),
-                    "Exercise_Hours": pd.Series(dtype="float64"),
-                    "Academic_Workload": pd.Series(dtype="int64"),
-                    "Anxiety_Level": pd.Series(dtype="int64"),
-                    "Social_Support": pd.Series(dtype="int64"),
-                    "Depression_Level": pd.Series(dtype="int64"),
-                    "Financial_Stress": pd.Series(dtype="int64"),
-                    "Relationship_Stress": pd.Series(dtype="int64"),
-                    "Coping_Frequency": pd.Series(dtype="int64"),
-                    "Screen_Time": pd.Series(dtype="int64"),
-                    "Nutrition_Quality": pd.Series(dtype="int64"),
-                    "Self_Esteem": pd.Series(dtype="int64"),
-                    "Work_Life_Balance": pd.Series(dtype="int64"),
-                    "Future_Optimism": pd.Series(dtype="int64"),
-                    "Recommendation": pd.Series(dtype="string")
-                })
-            
-            # Select relevant columns for display
-            display_cols = ['Username', 'Name', 'Age', 'Stress_Level', 'Sleep_Hours', 'Exercise_Hours', 'Recommendation']
-            # Include model risk if available
-            if 'Risk_Probability' in df.columns:
-                display_cols.insert(6, 'Risk_Probability')
-            if 'Academic_Workload' in df.columns:
-                display_cols.extend(['Academic_Workload', 'Anxiety_Level', 'Depression_Level', 'Social_Support'])
-            
-            if not df.empty:
-                st.dataframe(df[display_cols])
-            else:
-                st.info("No student responses available yet. You can add new responses below.")
-            
-            st.subheader("Edit/Add Responses")
-            st.info("You can edit existing responses or add new ones directly in the table below. Click 'Save Changes' to update the data.")
-            
-            # Create editable dataframe (always show, even if empty)
-            edited_df = st.data_editor(
-                df,
-                column_config={
-                    "Username": st.column_config.TextColumn("Username", width="medium"),
-                    "Name": st.column_config.TextColumn("Name", width="medium"),
-                    "Age": st.column_config.NumberColumn("Age", min_value=10, max_value=100),
-                    "Stress_Level": st.column_config.NumberColumn("Stress Level", min_value=1, max_value=10),
-                    "Sleep_Hours": st.column_config.NumberColumn("Sleep Hours", min_value=0.0, max_value=24.0),
-                    "Exercise_Hours": st.column_config.NumberColumn("Exercise Hours", min_value=0.0, max_value=168.0),
-                    "Academic_Workload": st.column_config.NumberColumn("Academic Workload", min_value=1, max_value=10),
-                    "Anxiety_Level": st.column_config.NumberColumn("Anxiety Level", min_value=1, max_value=10),
-                    "Depression_Level": st.column_config.NumberColumn("Depression Level", min_value=1, max_value=10),
-                    "Social_Support": st.column_config.NumberColumn("Social Support", min_value=1, max_value=10),
-                    "Financial_Stress": st.column_config.NumberColumn("Financial Stress", min_value=1, max_value=10),
-                    "Relationship_Stress": st.column_config.NumberColumn("Relationship Stress", min_value=1, max_value=10),
-                    "Coping_Frequency": st.column_config.NumberColumn("Coping Frequency", min_value=1, max_value=10),
-                    "Screen_Time": st.column_config.NumberColumn("Screen Time", min_value=1, max_value=10),
-                    "Nutrition_Quality": st.column_config.NumberColumn("Nutrition Quality", min_value=1, max_value=10),
-                    "Self_Esteem": st.column_config.NumberColumn("Self Esteem", min_value=1, max_value=10),
-                    "Work_Life_Balance": st.column_config.NumberColumn("Work Life Balance", min_value=1, max_value=10),
-                    "Future_Optimism": st.column_config.NumberColumn("Future Optimism", min_value=1, max_value=10),
-                    "Recommendation": st.column_config.TextColumn("Recommendation", width="large"),
-                },
-                hide_index=True,
-                use_container_width=True,
-                num_rows="dynamic"  # Allow adding new rows
-            )
-            
-            if st.button("Save Changes", type="primary"):
-                try:
-                    # Remove empty rows before saving
-                    edited_df = edited_df.dropna(how='all')
-                    edited_df.to_csv("student_survey_results.csv", index=False)
-                    st.success("Changes saved successfully!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error saving changes: {str(e)}")
-            
-            # Download options
-            if not df.empty:
-                st.subheader("Download Data")
-                col1, col2 = st.columns(2)
-                with col1:
-                    csv_data = df.to_csv(index=False)
-                    st.download_button("Download as CSV", csv_data, file_name="student_responses.csv", mime="text/csv")
-                with col2:
-                    # For Excel, need to use BytesIO
-                    from io import BytesIO
-                    buffer = BytesIO()
-                    df.to_excel(buffer, index=False, engine='openpyxl')
-                    buffer.seek(0)
-                    st.download_button("Download as Excel", buffer, file_name="student_responses.xlsx", mime="application/vnd.openpyxlformats-officedocument.spreadsheetml.sheet")
-            else:
-                st.info("Add some responses above to enable download options.")
+            show_student_responses()
     else:
         st.sidebar.write(f"Welcome, {st.session_state.current_user}!")
         if st.sidebar.button("Logout"):
             st.session_state.logged_in = False
-            # Clear session from users data
-            if st.session_state.current_user in users:
-                users[st.session_state.current_user].pop('session_token', None)
-                users[st.session_state.current_user].pop('token_timestamp', None)
-                with open('users.json', 'w') as f:
-                    json.dump(users, f)
-            # Clear session state file
-            clear_session_state(st.session_state.current_user)
-            # Clear URL parameters
-            try:
-                st.query_params.clear()
-            except:
-                pass
+            end_session()
             st.rerun()
         
         # Add daily mood check-in and mental health tips in sidebar
@@ -1001,12 +786,12 @@ else:
                 st.write("Uploaded Data:")
                 st.dataframe(df)
                 if st.button("Analyze Data"):
-                    analyzed_df = analyze_data(df)
-                    st.write("Analyzed Results:")
+                    # Rows from a previously downloaded results file keep their analysis
+                    analyzed_df, counts = analyze_data_incremental(df, workers=None)
+                    st.write(f"Analyzed Results ({counts['recomputed']} rows analyzed, {counts['reused']} unchanged):")
                     st.dataframe(analyzed_df)
                     # Save results
-                    output_path = "student_survey_results.csv"
-                    save_results(analyzed_df, output_path)
+                    write_results(analyzed_df)
                     # Generate charts
                     plot_stress_distribution(analyzed_df, "stress_distribution.png")
                     plot_sleep_distribution(analyzed_df, "sleep_distribution.png")
@@ -1018,8 +803,7 @@ else:
                         st.image("sleep_distribution.png", caption="Sleep Distribution")
                     with col3:
                         st.image("recommendations_summary.png", caption="Recommendations")
-                    with open(output_path, "rb") as f:
-                        st.download_button("Download Results CSV", f, file_name=output_path)
+                    st.download_button("Download Results CSV", analyzed_df.to_csv(index=False), file_name="student_survey_results.csv", mime="text/csv")
         
         elif option == "Take Individual Survey":
             st.subheader("Personal Wellness Survey")
@@ -1046,7 +830,7 @@ else:
             exercise = st.number_input("Weekly Exercise Hours", min_value=0.0, max_value=168.0, value=2.0)
             
             if st.button("Get My Recommendation"):
-                df = pd.DataFrame([{
+                analyzed = analyze_record({
                     "Username": st.session_state.current_user,
                     "Age": age,
                     "Stress_Level": stress, "Sleep_Hours": sleep, "Exercise_Hours": exercise,
@@ -1054,21 +838,15 @@ else:
                     "Depression_Level": depression, "Financial_Stress": financial_stress, "Relationship_Stress": relationship_stress,
                     "Coping_Frequency": coping_frequency, "Screen_Time": screen_time, "Nutrition_Quality": nutrition,
                     "Self_Esteem": self_esteem, "Work_Life_Balance": work_life_balance, "Future_Optimism": future_optimism
-                }])
-                analyzed_df = analyze_data(df)
+                })
                 # Show model risk if computed
-                if 'Risk_Probability' in analyzed_df.columns:
-                    risk = float(analyzed_df.iloc[0]['Risk_Probability'])
+                if 'Risk_Probability' in analyzed:
+                    risk = float(analyzed['Risk_Probability'])
                     st.metric(label="Estimated Risk (Logistic Regression)", value=f"{risk*100:.1f}%")
-                recommendation = analyzed_df.iloc[0]['Recommendation']
+                recommendation = analyzed['Recommendation']
                 st.success(f"**{recommendation}**")
-                # Append to results csv
-                if os.path.exists("student_survey_results.csv"):
-                    existing_df = pd.read_csv("student_survey_results.csv")
-                    updated_df = pd.concat([existing_df, analyzed_df], ignore_index=True)
-                else:
-                    updated_df = analyzed_df
-                save_results(updated_df, "student_survey_results.csv")
+                # Append to stored results
+                append_submission(analyzed)
                 st.info("Your response has been saved.")
 
         elif option == "Chat with Mental Health Assistant":
@@ -1081,14 +859,10 @@ else:
 
             # Get user's recent survey data for context
             user_data = None
-            if os.path.exists("student_survey_results.csv"):
-                try:
-                    survey_df = pd.read_csv("student_survey_results.csv")
-                    user_surveys = survey_df[survey_df['Username'] == st.session_state.current_user]
-                    if not user_surveys.empty:
-                        user_data = user_surveys.iloc[-1].to_dict()
-                except:
-                    pass
+            try:
+                user_data = latest_submission(st.session_state.current_user)
+            except:
+                pass
 
             # Chat container
             chat_container = st.container()
@@ -0,0 +1,208 @@
+"""
+Benchmark of the survey analysis pipeline on synthetic data.
+
+Times load_data, save_results, _predict_risk, the recommendation engine,
+analyze_data and the plot_* functions at several data sizes and writes the
+results as JSON so runs from different releases can be compared:
+
+    python benchmark_analysis.py --sizes 1000 100000 1000000 --output before.json
+    python benchmark_analysis.py --output after.json --compare before.json
+
+Each size runs in a fresh worker process so its peak RSS is not inflated by
+the sizes before it. Timings are the best of --repeat runs.
+"""
+import os
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from results_store import SCALE_COLUMNS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Row-by-row generate_recommendation is only timed up to this size; beyond it
+# the run takes minutes and says nothing the smaller sizes don't.
+ROWWISE_MAX_ROWS = 100_000
+
+# plot_recommendation_summary draws one labelled bar per distinct
+# recommendation text, so its cost follows the number of distinct texts
+# (close to the row count for uniformly random answers), not the rows:
+# about 12 s at 50 rows and minutes at 1,000.
+SUMMARY_PLOT_MAX_ROWS = 200
+
+
+def make_survey_data(n, seed=0):
+    """Return n synthetic survey submissions with the app's full schema:
+    Username, Age, Stress_Level, Sleep_Hours, Exercise_Hours and the twelve
+    other 1-10 scales, with the value ranges the survey form allows.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Username': pd.Series(np.arange(n)).map('student{}'.format),
+        'Age': rng.integers(17, 31, n),
+    })
+    for c in SCALE_COLUMNS:
+        df[c] = rng.integers(1, 11, n)
+    # Sliders step by 0.5 hours
+    df.insert(3, 'Sleep_Hours', rng.integers(6, 21, n) / 2)
+    df.insert(4, 'Exercise_Hours', rng.integers(0, 21, n) / 2)
+    return df
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _time(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _run_size(n, repeat, seed, rowwise_max, summary_plot_max):
+    """Benchmark every stage at one size; runs inside a worker process."""
+    import analysis
+
+    stages = {}
+
+    def stage(name, fn, rows=n):
+        seconds, result = _time(fn, repeat)
+        stages[name] = {
+            'seconds': round(seconds, 6),
+            'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        return result
+
+    df = stage('generate', lambda: make_survey_data(n, seed), rows=n)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'survey.csv')
+        parquet_path = os.path.join(tmp, 'survey.parquet')
+        stage('save_results_csv', lambda: analysis.save_results(df, csv_path))
+        stage('load_data_csv', lambda: analysis.load_data(csv_path))
+        stage('save_results_parquet', lambda: analysis.save_results(df, parquet_path))
+        stage('load_data_parquet', lambda: analysis.load_data(parquet_path))
+        sizes = {'csv_bytes': os.path.getsize(csv_path), 'parquet_bytes': os.path.getsize(parquet_path)}
+
+    snapshot = analysis._load_model()
+    if snapshot.model is not None:
+        stage('predict_risk', lambda: analysis._predict_risk(df, snapshot))
+    stage('generate_recommendations', lambda: analysis.generate_recommendations(df))
+    if n <= rowwise_max:
+        stage('generate_recommendation_rowwise', lambda: df.apply(analysis.generate_recommendation, axis=1))
+    analyzed = stage('analyze_data', lambda: analysis.analyze_data(df.copy()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plots = [analysis.plot_stress_distribution, analysis.plot_sleep_distribution]
+        if n <= summary_plot_max:
+            plots.append(analysis.plot_recommendation_summary)
+        for plot in plots:
+            stage(plot.__name__, lambda: plot(analyzed, os.path.join(tmp, f'{plot.__name__}.png')))
+
+    return {
+        'rows': n,
+        'model_loaded': snapshot.model is not None,
+        'distinct_recommendations': int(analyzed['Recommendation'].nunique()),
+        'files': sizes,
+        'stages': stages,
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, repeat=3, seed=0, rowwise_max=ROWWISE_MAX_ROWS, summary_plot_max=SUMMARY_PLOT_MAX_ROWS):
+    """Benchmark each size in its own worker process; returns the report dict."""
+    results = []
+    for n in sizes:
+        # spawn, not fork: a forked child would inherit the parent's peak RSS
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(_run_size, n, repeat, seed, rowwise_max, summary_plot_max).result()
+        results.append(result)
+        print(format_result(result), flush=True)
+    return {'environment': _environment(), 'repeat': repeat, 'seed': seed, 'results': results}
+
+
+def format_result(result):
+    lines = [f"{result['rows']:,} rows ({result['distinct_recommendations']:,} distinct recommendations)"]
+    for name, s in result['stages'].items():
+        rss = f"{s['peak_rss_mb']:>9.1f} MB" if s['peak_rss_mb'] is not None else ''
+        lines.append(f"  {name:<34}{s['seconds']:>10.4f} s{s['rows_per_sec'] or 0:>14,.0f} rows/s{rss}")
+    return '\n'.join(lines)
+
+
+def compare(report, baseline):
+    """Print the speedup of each stage in report over baseline (same sizes only)."""
+    old = {r['rows']: r['stages'] for r in baseline['results']}
+    print(f"\nSpeedup vs {baseline['environment'].get('commit') or 'baseline'} (>1 is faster):")
+    for result in report['results']:
+        before = old.get(result['rows'])
+        if before is None:
+            continue
+        print(f"{result['rows']:,} rows")
+        for name, s in result['stages'].items():
+            if name in before and s['seconds']:
+                print(f"  {name:<34}{before[name]['seconds'] / s['seconds']:>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the survey analysis pipeline on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="row counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic data")
+    parser.add_argument("--rowwise-max", type=int, default=ROWWISE_MAX_ROWS, help="largest size to time row-by-row recommendations at")
+    parser.add_argument("--summary-plot-max", type=int, default=SUMMARY_PLOT_MAX_ROWS, help="largest size to time plot_recommendation_summary at")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON report")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, repeat=args.repeat, seed=args.seed, rowwise_max=args.rowwise_max,
+                           summary_plot_max=args.summary_plot_max)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
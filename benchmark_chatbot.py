@@ -0,0 +1,131 @@
+"""
+Per-message benchmark of the chatbot's text analysis on synthetic messages.
+
+Compares the original pipeline (NLTK word_tokenize, stopword filtering and a
+substring test per keyword, then VADER) with the shared keyword stage
+(chatbot.message_features, which skips tokenizing) and the full
+analyze_message:
+
+    python benchmark_chatbot.py --messages 5000 --output chatbot.json
+
+word_tokenize needs NLTK's punkt data; without it the baseline tokenizes
+line by line (preserve_line=True), which skips sentence splitting and so
+understates the original cost, as does a missing stopwords corpus (nothing
+is filtered). Timings are the best of --repeat runs.
+"""
+import argparse
+import json
+import random
+import time
+
+import chatbot
+
+FILLER = [
+    "i", "have", "been", "really", "so", "today", "lately", "at", "night", "with", "my", "classes",
+    "and", "the", "exams", "friends", "don't", "know", "what", "to", "do", "it's", "been", "a", "week",
+]
+
+
+def make_messages(n, seed=0):
+    """n chat-like messages mixing lexicon keywords with filler words and punctuation."""
+    rng = random.Random(seed)
+    keywords = [k for words in chatbot.INTENT_KEYWORDS.values() for k in words] + chatbot.HEADACHE_KEYWORDS
+    messages = []
+    for _ in range(n):
+        words = rng.choices(FILLER, k=rng.randint(4, 20)) + rng.choices(keywords, k=rng.randint(0, 3))
+        rng.shuffle(words)
+        text = ' '.join(words)
+        messages.append(text[0].upper() + text[1:] + rng.choice(['.', '!', '?', '...', '']))
+    return messages
+
+
+def _word_tokenize():
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt_tab/english/')
+        return nltk.word_tokenize, 'word_tokenize'
+    except LookupError:
+        return (lambda text: nltk.word_tokenize(text, preserve_line=True)), 'word_tokenize (preserve_line)'
+
+
+def _stop_words():
+    from nltk.corpus import stopwords
+    try:
+        return set(stopwords.words('english'))
+    except LookupError:
+        return set()
+
+
+def _legacy_features(word_tokenize, stop):
+    lexicons = dict(crisis=chatbot.CRISIS_KEYWORDS, headache=chatbot.HEADACHE_KEYWORDS, **chatbot.INTENT_KEYWORDS)
+
+    def features(message):
+        lower = message.lower()
+        tokens = [word for word in word_tokenize(lower) if word not in stop]
+        counts = {name: sum(keyword in lower for keyword in words) for name, words in lexicons.items()}
+        return tokens, counts
+
+    return features
+
+
+def _per_message(fn, messages, repeat, clear=None):
+    best = None
+    for _ in range(repeat):
+        if clear:
+            clear()
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(messages)
+
+
+def run_benchmark(n=5000, repeat=3, seed=0):
+    """Return microseconds per message for each stage."""
+    startup = chatbot.warm_up()
+    messages = make_messages(n, seed)
+    word_tokenize, tokenizer = _word_tokenize()
+    legacy = _legacy_features(word_tokenize, _stop_words())
+    analyzer = chatbot.vader_analyzer()
+    bot = chatbot.AdvancedMentalHealthChatbot()
+
+    stages = {
+        'legacy_tokenize_and_keywords': _per_message(legacy, messages, repeat),
+        'legacy_with_vader': _per_message(lambda m: (legacy(m), analyzer.polarity_scores(m)), messages, repeat),
+        'message_features': _per_message(chatbot.message_features.__wrapped__, messages, repeat),
+        'vader': _per_message(analyzer.polarity_scores, messages, repeat),
+        # Uncached, as for a message seen for the first time
+        'analyze_message': _per_message(bot._analyze_message, messages, repeat, clear=chatbot.message_features.cache_clear),
+    }
+    return {
+        'messages': n,
+        'baseline_tokenizer': tokenizer,
+        'startup': startup,
+        'us_per_message': {name: round(seconds * 1e6, 2) for name, seconds in stages.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chatbot's per-message text analysis.")
+    parser.add_argument("--messages", type=int, default=5000, help="synthetic messages to analyze")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic messages")
+    parser.add_argument("--output", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.messages, repeat=args.repeat, seed=args.seed)
+    stages = report['us_per_message']
+    print(f"{report['messages']:,} messages; baseline tokenizer: {report['baseline_tokenizer']}")
+    for name, us in stages.items():
+        print(f"  {name:<32}{us:>10.2f} us/message")
+    print(f"Keyword stage speedup: {stages['legacy_tokenize_and_keywords'] / stages['message_features']:.1f}x; "
+          f"with sentiment: {stages['legacy_with_vader'] / stages['analyze_message']:.1f}x")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,233 @@
-import json
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import os
 import random
 import re
+import argparse
 import datetime
-import nltk
-from textblob import TextBlob
-import pandas as pd
-import os
-from analysis import generate_recommendation, load_data
-from collections import defaultdict, Counter
-import math
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('tokenizers/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-
-try:
-    nltk.data.find('sentiment/vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon', quiet=True)
-
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
-
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+import functools
+import itertools
+import threading
+import conversation_store
+from conversation_memory import ConversationMemory
+from collections import defaultdict, deque, Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+# NLP resources are loaded the first time the bot needs them, not on import.
+# NLTK data is looked up in NLTK_DATA_DIR ahead of NLTK's usual locations and
+# anything missing is downloaded there, unless CHATBOT_OFFLINE is set; then a
+# LookupError says what to install. To bundle the data for offline hosts:
+#     python -m nltk.downloader -d nltk_data vader_lexicon
+NLTK_DATA_DIR = os.environ.get('CHATBOT_NLTK_DATA') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+OFFLINE = os.environ.get('CHATBOT_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+_resources = {}
+_resources_lock = threading.RLock()
+# Seconds each resource took to load; see startup_report()
+STARTUP_TIMINGS = {}
+_warm_up_started = False
+
+
+def _resource(name, load):
+    try:
+        return _resources[name]
+    except KeyError:
+        pass
+    with _resources_lock:
+        if name not in _resources:
+            start = time.perf_counter()
+            _resources[name] = load()
+            STARTUP_TIMINGS[name] = round(time.perf_counter() - start, 4)
+    return _resources[name]
+
+
+def _import_nltk():
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    return nltk
+
+
+def _require(nltk, path, package):
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        if OFFLINE or not nltk.download(package, download_dir=NLTK_DATA_DIR, quiet=True):
+            raise LookupError(f"NLTK data '{package}' is not installed; run: "
+                              f"python -m nltk.downloader -d {NLTK_DATA_DIR} {package}") from None
+
+
+def _load_vader(nltk):
+    _require(nltk, 'sentiment/vader_lexicon.zip', 'vader_lexicon')
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def vader_analyzer():
+    """The shared VADER SentimentIntensityAnalyzer, loaded on first use."""
+    nltk = _resource('nltk', _import_nltk)
+    return _resource('vader_lexicon', lambda: _load_vader(nltk))
+
+
+def warm_up():
+    """Load the NLP resources now instead of on the first message; returns
+    startup_report().
+    """
+    vader_analyzer()
+    return startup_report()
+
+
+def warm_up_in_background():
+    """Start warm_up() in a daemon thread, once per process, so the app can
+    render while the resources load.
+    """
+    global _warm_up_started
+    with _resources_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+
+    def run():
+        try:
+            warm_up()
+        except LookupError:
+            # Raised again, with the fix, when the first message needs the data
+            pass
+
+    threading.Thread(target=run, daemon=True, name='chatbot-warm-up').start()
+
+
+def startup_report():
+    """Seconds spent importing this module and loading each NLP resource
+    loaded so far, plus where NLTK data is looked up.
+    """
+    return {
+        'import': _IMPORT_SECONDS,
+        **STARTUP_TIMINGS,
+        'nltk_data_dir': NLTK_DATA_DIR,
+        'offline': OFFLINE,
+    }
+
+SIMPLE_GREETINGS = frozenset(['hi', 'hello', 'hey', 'hi there', 'hello there', 'hey there'])
+
+# Intent lexicons. Keywords match anywhere in the lower-cased message, like
+# `keyword in message`, and each keyword counts once per message.
+CRISIS_KEYWORDS = [
+    'suicide', 'kill myself', 'end it all', 'not worth living', 'harm myself',
+    'die', 'crisis', 'emergency', 'help me', 'can\'t take it anymore',
+    'want to die', 'life not worth living'
+]
+HEADACHE_KEYWORDS = ['headache', 'head pain', 'migraine', 'head hurt', 'head hurts']
+# Scored intents, in tie-break order
+INTENT_KEYWORDS = {
+    'mood': ['feel', 'feeling', 'mood', 'emotion', 'happy', 'sad', 'angry', 'excited', 'down', 'upset'],
+    'stress': ['stress', 'stressed', 'overwhelmed', 'pressure', 'workload', 'deadlines', 'busy', 'tired'],
+    'anxiety': ['anxious', 'anxiety', 'worried', 'worrying', 'panic', 'nervous', 'scared', 'fear'],
+    'depression': ['depressed', 'depression', 'sad', 'hopeless', 'empty', 'worthless', 'lonely', 'isolated'],
+    'sleep': ['sleep', 'insomnia', 'tired', 'exhausted', 'fatigue', 'restless', 'nightmares'],
+}
+# Intents that get a boost when they come up again in recent messages
+HISTORY_INTENTS = ('stress', 'anxiety', 'depression')
+
+
+def _trie_pattern(words):
+    """Regex alternation for words with shared prefixes factored out, so the
+    engine picks a branch by the next character instead of trying every word.
+    Longer words are preferred over their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+class _KeywordMatcher:
+    """Several keyword lexicons compiled into one regex, scanned once per text.
+
+    The pattern is a lookahead, so it reports the longest keyword starting at
+    every position. Shorter keywords hidden inside a reported one (e.g. 'feel'
+    in 'feeling') are credited through a precomputed table, which keeps the
+    results identical to testing each keyword with `in`.
+    """
+
+    def __init__(self, lexicons):
+        keywords = sorted({keyword for words in lexicons.values() for keyword in words})
+        self._lexicons = {keyword: [name for name, words in lexicons.items() if keyword in words] for keyword in keywords}
+        self._contained = {keyword: [other for other in keywords if other in keyword] for keyword in keywords}
+        self._pattern = re.compile('(?=(' + _trie_pattern(keywords) + '))')
+
+    def keywords(self, text):
+        """The set of keywords occurring in text."""
+        found = set()
+        for longest in self._pattern.findall(text):
+            found.update(self._contained[longest])
+        return found
+
+    def counts(self, text):
+        """Counter of how many distinct keywords of each lexicon occur in text."""
+        counts = Counter()
+        for keyword in self.keywords(text):
+            for name in self._lexicons[keyword]:
+                counts[name] += 1
+        return counts
+
+
+_INTENT_MATCHER = _KeywordMatcher(dict(crisis=CRISIS_KEYWORDS, headache=HEADACHE_KEYWORDS, **INTENT_KEYWORDS))
+
+
+# Everything the bot derives from one message. intent ignores conversation
+# history; get_response swaps in the history-aware intent.
+MessageAnalysis = namedtuple('MessageAnalysis', ['text', 'intent', 'sentiment', 'sentiment_scores'])
+
+# The shared preprocessing stage: lower-cased text and keyword counts per
+# lexicon, computed once per message text. Keywords are matched as
+# substrings of the text (e.g. 'feel' in 'feelings'), so no tokenizing or
+# stopword list is involved.
+MessageFeatures = namedtuple('MessageFeatures', ['lower', 'counts'])
+
+# Distinct messages whose analysis is kept per chatbot instance
+MESSAGE_CACHE_SIZE = 512
+
+# Streamlit sessions share the global bot, each in its own thread. A user's
+# emotional state is guarded by one of this many locks, picked by username,
+# so concurrent sessions of one user don't lose updates and different users
+# rarely wait on each other.
+USER_LOCK_STRIPES = 64
+
+
+def normalize_message(message):
+    """Collapse runs of whitespace so trivially different messages share one analysis."""
+    return ' '.join(message.split())
+
+
+@functools.lru_cache(maxsize=1024)
+def message_features(message):
+    """The MessageFeatures of message. Intent detection, the history boost
+    and analyze_message all read them from here, and every message is looked
+    at again as history for the next three turns, hence the cache; callers
+    must not modify the result. VADER keeps its own tokenization, since it
+    scores case and punctuation.
+    """
+    lower = message.lower()
+    return MessageFeatures(lower, _INTENT_MATCHER.counts(lower))
 
 class AdvancedMentalHealthChatbot:
     def __init__(self):
-        self.vader_analyzer = SentimentIntensityAnalyzer()
-        self.stop_words = set(stopwords.words('english'))
-
         # Enhanced response database with more context-aware responses
         self.responses = {
             'greeting': [
@@ -277,11 +465,21 @@ class AdvancedMentalHealthChatbot:
             }
         }
 
+        # Bounded per-instance cache of analyze_message results
+        self._analyze_cached = functools.lru_cache(maxsize=MESSAGE_CACHE_SIZE)(self._analyze_message)
+
         # Conversation context tracking
-        self.conversation_memory = defaultdict(list)
+        # Bounded per user and evicted when idle; emotional state goes with it
+        # (it is saved with each conversation and reloaded on return)
+        self.conversation_memory = ConversationMemory(on_evict=self._forget_user)
+        self._user_locks = [threading.RLock() for _ in range(USER_LOCK_STRIPES)]
         self.user_profiles = {}
         self.emotional_states = defaultdict(lambda: {'current_mood': 'neutral', 'stress_level': 5, 'anxiety_level': 5})
 
+    @property
+    def vader_analyzer(self):
+        return vader_analyzer()
+
     def analyze_sentiment_advanced(self, text):
         """Advanced sentiment analysis using VADER"""
         scores = self.vader_analyzer.polarity_scores(text)
@@ -296,86 +494,60 @@ class AdvancedMentalHealthChatbot:
         else:
             return 'neutral', scores
 
+    def _analyze_message(self, text):
+        sentiment, scores = self.analyze_sentiment_advanced(text)
+        return MessageAnalysis(text, self.detect_intent_advanced(text), sentiment, scores)
+
+    def analyze_message(self, message, conversation_history=None):
+        """Return the MessageAnalysis of message, computed once per distinct
+        (whitespace-normalized) text. With conversation_history the intent is
+        re-scored with the history boost; the rest comes from the cache.
+        Callers must treat the result, including sentiment_scores, as read-only.
+        """
+        analysis = self._analyze_cached(normalize_message(message))
+        if conversation_history:
+            intent = self.detect_intent_advanced(analysis.text, conversation_history)
+            if intent != analysis.intent:
+                analysis = analysis._replace(intent=intent)
+        return analysis
+
     def detect_intent_advanced(self, message, conversation_history=None):
         """Advanced intent detection with context awareness"""
-        message_lower = message.lower()
-        tokens = word_tokenize(message_lower)
-
-        # Remove stopwords for better analysis
-        filtered_tokens = [word for word in tokens if word not in self.stop_words]
+        features = message_features(message)
 
         # Simple greeting detection (handle casual greetings like "hi", "hello")
-        simple_greetings = ['hi', 'hello', 'hey', 'hi there', 'hello there', 'hey there']
-        if message_lower.strip() in simple_greetings or message_lower.strip() in ['hi', 'hello', 'hey']:
+        if features.lower.strip() in SIMPLE_GREETINGS:
             return 'casual_greeting'
 
+        # One pass over the message scored every lexicon
+        counts = features.counts
+
         # Crisis detection (highest priority)
-        crisis_keywords = [
-            'suicide', 'kill myself', 'end it all', 'not worth living', 'harm myself',
-            'die', 'crisis', 'emergency', 'help me', 'can\'t take it anymore',
-            'want to die', 'life not worth living'
-        ]
-
-        for keyword in crisis_keywords:
-            if keyword in message_lower:
-                return 'crisis'
-
-        # Enhanced keyword detection with context
-        intent_scores = defaultdict(float)
-
-        # Mood-related (most common)
-        mood_keywords = ['feel', 'feeling', 'mood', 'emotion', 'happy', 'sad', 'angry', 'excited', 'down', 'upset']
-        for keyword in mood_keywords:
-            if keyword in message_lower:
-                intent_scores['mood'] += 1
-
-        # Stress-related
-        stress_keywords = ['stress', 'stressed', 'overwhelmed', 'pressure', 'workload', 'deadlines', 'busy', 'tired']
-        for keyword in stress_keywords:
-            if keyword in message_lower:
-                intent_scores['stress'] += 1
-
-        # Anxiety-related
-        anxiety_keywords = ['anxious', 'anxiety', 'worried', 'worrying', 'panic', 'nervous', 'scared', 'fear']
-        for keyword in anxiety_keywords:
-            if keyword in message_lower:
-                intent_scores['anxiety'] += 1
-
-        # Depression-related
-        depression_keywords = ['depressed', 'depression', 'sad', 'hopeless', 'empty', 'worthless', 'lonely', 'isolated']
-        for keyword in depression_keywords:
-            if keyword in message_lower:
-                intent_scores['depression'] += 1
-
-        # Sleep-related
-        sleep_keywords = ['sleep', 'insomnia', 'tired', 'exhausted', 'fatigue', 'restless', 'nightmares']
-        for keyword in sleep_keywords:
-            if keyword in message_lower:
-                intent_scores['sleep'] += 1
-
-        # Headache-related keywords
-        if any(word in message_lower for word in ['headache', 'head pain', 'migraine', 'head hurt', 'head hurts']):
+        if counts['crisis']:
+            return 'crisis'
+
+        if counts['headache']:
             return 'headache'
 
+        # Scored intents; ties go to the first intent in INTENT_KEYWORDS order
+        intent_scores = {intent: float(counts[intent]) for intent in INTENT_KEYWORDS if counts[intent]}
+
         # Context from conversation history
         if conversation_history:
-            recent_topics = conversation_history[-3:] if len(conversation_history) >= 3 else conversation_history
-            for past_message in recent_topics:
-                past_lower = past_message.lower()
-                for intent, keywords in [('stress', stress_keywords), ('anxiety', anxiety_keywords), ('depression', depression_keywords)]:
-                    for keyword in keywords:
-                        if keyword in past_lower:
-                            intent_scores[intent] += 0.5  # Boost score for recurring topics
+            for past_message in conversation_history[-3:]:
+                past_counts = message_features(past_message).counts
+                for intent in HISTORY_INTENTS:
+                    if past_counts[intent]:
+                        # Boost score for recurring topics
+                        intent_scores[intent] = intent_scores.get(intent, 0.0) + 0.5 * past_counts[intent]
 
         # Determine primary intent
         if intent_scores:
-            primary_intent = max(intent_scores, key=intent_scores.get)
-            if intent_scores[primary_intent] > 0:
-                return primary_intent
+            return max(intent_scores, key=intent_scores.get)
 
         return 'general'
 
-    def generate_contextual_response(self, intent, sentiment, user_data=None, conversation_history=None):
+    def generate_contextual_response(self, intent, sentiment, user_data=None, conversation_history=None, message=''):
         """Generate sophisticated, context-aware responses"""
         response = {
             'message': '',
@@ -449,6 +621,7 @@ class AdvancedMentalHealthChatbot:
         else:  # general conversation
             # Check if it's a general question
             question_answered = False
+            message_lower = message.lower()
             for question, answers in self.general_responses['questions'].items():
                 if question in message_lower:
                     response['message'] = random.choice(answers)
@@ -475,50 +648,69 @@ class AdvancedMentalHealthChatbot:
 
         return response
 
+    def _user_lock(self, username):
+        return self._user_locks[hash(username) % len(self._user_locks)]
+
+    def _forget_user(self, username):
+        with self._user_lock(username):
+            self.emotional_states.pop(username, None)
+
+    def emotional_state(self, username):
+        """A copy of the user's current emotional state ({} if untracked)."""
+        with self._user_lock(username):
+            return dict(self.emotional_states.get(username, {}))
+
     def update_emotional_state(self, username, intent, sentiment):
-        """Track user's emotional state over time"""
+        """Track user's emotional state over time; returns a copy of the new state"""
+        saved = None
         if username not in self.emotional_states:
-            self.emotional_states[username] = {'current_mood': 'neutral', 'stress_level': 5, 'anxiety_level': 5}
-
-        # Update based on conversation patterns
-        if intent == 'stress':
-            self.emotional_states[username]['stress_level'] = min(10, self.emotional_states[username]['stress_level'] + 1)
-        elif intent == 'anxiety':
-            self.emotional_states[username]['anxiety_level'] = min(10, self.emotional_states[username]['anxiety_level'] + 1)
-        elif intent == 'mood' and sentiment == 'positive':
-            self.emotional_states[username]['stress_level'] = max(1, self.emotional_states[username]['stress_level'] - 0.5)
-            self.emotional_states[username]['anxiety_level'] = max(1, self.emotional_states[username]['anxiety_level'] - 0.5)
-
-        # Update current mood
-        if sentiment == 'positive':
-            self.emotional_states[username]['current_mood'] = 'positive'
-        elif sentiment == 'negative':
-            self.emotional_states[username]['current_mood'] = 'negative'
-        else:
-            self.emotional_states[username]['current_mood'] = 'neutral'
+            # Carry on from the state saved in an earlier session, if any
+            saved = conversation_store.read_state(username)
+
+        with self._user_lock(username):
+            state = self.emotional_states.get(username)
+            if state is None:
+                state = self.emotional_states[username] = saved or {'current_mood': 'neutral', 'stress_level': 5, 'anxiety_level': 5}
+
+            # Update based on conversation patterns
+            if intent == 'stress':
+                state['stress_level'] = min(10, state['stress_level'] + 1)
+            elif intent == 'anxiety':
+                state['anxiety_level'] = min(10, state['anxiety_level'] + 1)
+            elif intent == 'mood' and sentiment == 'positive':
+                state['stress_level'] = max(1, state['stress_level'] - 0.5)
+                state['anxiety_level'] = max(1, state['anxiety_level'] - 0.5)
+
+            # Update current mood
+            if sentiment == 'positive':
+                state['current_mood'] = 'positive'
+            elif sentiment == 'negative':
+                state['current_mood'] = 'negative'
+            else:
+                state['current_mood'] = 'neutral'
+            return dict(state)
 
     def get_response(self, message, user_data=None, username=None, conversation_history=None):
-        """Enhanced main response generation method"""
+        """Enhanced main response generation method
+
+        The returned dict carries the MessageAnalysis under 'analysis' so
+        save_conversation can reuse it.
+        """
         # Analyze sentiment and intent
-        sentiment, sentiment_scores = self.analyze_sentiment_advanced(message)
-        intent = self.detect_intent_advanced(message, conversation_history or [])
+        analysis = self.analyze_message(message, conversation_history)
+        intent, sentiment = analysis.intent, analysis.sentiment
 
         # Update emotional state tracking
         if username:
-            self.update_emotional_state(username, intent, sentiment)
-            self.conversation_memory[username].append({
-                'message': message,
-                'intent': intent,
-                'sentiment': sentiment,
-                'timestamp': datetime.datetime.now()
-            })
+            current_state = self.update_emotional_state(username, intent, sentiment)
+            # Not under the user's lock: appending may evict, and lock, other users
+            self.conversation_memory.append(username, message, intent, sentiment)
 
         # Generate contextual response
-        response = self.generate_contextual_response(intent, sentiment, user_data, conversation_history)
+        response = self.generate_contextual_response(intent, sentiment, user_data, conversation_history, message)
 
         # Add personalized elements if we have username
         if username:
-            current_state = self.emotional_states.get(username, {})
             if current_state.get('stress_level', 5) > 7:
                 response['suggestions'].append("Remember to be gentle with yourself during high-stress periods.")
             if current_state.get('anxiety_level', 5) > 7:
@@ -528,86 +720,204 @@ class AdvancedMentalHealthChatbot:
         if not response['message']:
             response['message'] = "I'm here to support you. Could you tell me more about how you're feeling or what you'd like to discuss?"
 
+        response['analysis'] = analysis
         return response
 
     def save_conversation(self, username, message, response):
         """Enhanced conversation saving with more detailed tracking"""
-        conversation_file = f"conversations/{username}_chat.json"
-
-        os.makedirs("conversations", exist_ok=True)
+        # Reuse the analysis get_response made for this message
+        analysis = response.get('analysis')
+        if analysis is None or analysis.text != normalize_message(message):
+            analysis = self.analyze_message(message)
 
         conversation_data = {
             'timestamp': datetime.datetime.now().isoformat(),
             'user_message': message,
             'bot_response': response['message'],
-            'intent': self.detect_intent_advanced(message),
-            'sentiment': self.analyze_sentiment_advanced(message)[0],
-            'emotional_state': dict(self.emotional_states.get(username, {}))
+            'intent': analysis.intent,
+            'sentiment': analysis.sentiment,
+            'emotional_state': self.emotional_state(username)
         }
 
-        # Load existing conversation or create new one
-        if os.path.exists(conversation_file):
-            try:
-                with open(conversation_file, 'r') as f:
-                    conversations = json.load(f)
-            except:
-                conversations = []
-        else:
-            conversations = []
-
-        conversations.append(conversation_data)
-
-        # Keep only last 200 conversations per user for advanced AI
-        if len(conversations) > 200:
-            conversations = conversations[-200:]
-
-        with open(conversation_file, 'w') as f:
-            json.dump(conversations, f, indent=2)
+        # Written by conversation_store's background writer, so this doesn't
+        # wait on the disk; the log is trimmed to the last 200 entries there too
+        conversation_store.save_entry(username, conversation_data)
+        if conversation_data['emotional_state']:
+            conversation_store.save_state(username, conversation_data['emotional_state'])
+
+    def memory_stats(self):
+        """What the bot holds in memory: conversation memory (see
+        ConversationMemory.stats), users with an emotional state, and the
+        message analysis cache.
+        """
+        stats = self.conversation_memory.stats()
+        stats['emotional_states'] = len(self.emotional_states)
+        stats['analysis_cache'] = self._analyze_cached.cache_info()._asdict()
+        return stats
 
     def get_user_insights(self, username):
-        """Advanced user insights with detailed analytics"""
-        conversation_file = f"conversations/{username}_chat.json"
-
-        if not os.path.exists(conversation_file):
-            return None
+        """Advanced user insights with detailed analytics
 
+        Served from running aggregates kept by conversation_store, so the
+        history is not re-read on every call.
+        """
         try:
-            with open(conversation_file, 'r') as f:
-                conversations = json.load(f)
-        except:
+            summary = conversation_store.insights(username)
+        except OSError:
             return None
 
-        if not conversations:
+        if not summary:
             return None
 
-        # Advanced analytics
-        intents = [conv.get('intent', 'general') for conv in conversations]
-        sentiments = [conv.get('sentiment', 'neutral') for conv in conversations]
-
         # Calculate conversation patterns
-        intent_counts = Counter(intents)
-        sentiment_counts = Counter(sentiments)
-
-        # Time-based analysis (last 30 days)
-        thirty_days_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-        recent_conversations = [
-            conv for conv in conversations
-            if datetime.datetime.fromisoformat(conv['timestamp']) > thirty_days_ago
-        ]
-
-        recent_intents = [conv.get('intent', 'general') for conv in recent_conversations]
+        intent_counts = Counter(summary['intents'])
+        sentiment_counts = Counter(summary['sentiments'])
 
         insights = {
-            'total_conversations': len(conversations),
+            'total_conversations': summary['total'],
             'most_common_intent': intent_counts.most_common(1)[0][0] if intent_counts else 'general',
             'intent_distribution': dict(intent_counts.most_common()),
             'overall_sentiment': sentiment_counts.most_common(1)[0][0] if sentiment_counts else 'neutral',
             'sentiment_distribution': dict(sentiment_counts.most_common()),
-            'recent_trends': Counter(recent_intents).most_common(),
-            'emotional_state_history': [conv.get('emotional_state', {}) for conv in conversations[-10:]]
+            # Time-based analysis (last 30 days)
+            'recent_trends': summary['recent_intents'].most_common(),
+            'emotional_state_history': summary['emotional_states']
         }
 
         return insights
 
 # Global chatbot instance
 chatbot = AdvancedMentalHealthChatbot()
+
+# Messages handed to a worker process at a time by the batch API
+BATCH_CHUNK_SIZE = 64
+
+
+def _init_worker():
+    """Process pool initializer: load the NLP resources once per worker."""
+    try:
+        warm_up()
+    except LookupError:
+        # Raised again from the first task, and from there in the caller
+        pass
+
+
+def _process_pool(workers):
+    # spawn, not fork: the app runs the bot in a threaded server, and a
+    # forked worker would inherit locks held by its other threads
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, mp_context=get_context('spawn'))
+
+
+def _analyze_chunk(messages):
+    return [chatbot.analyze_message(message) for message in messages]
+
+
+def _analyze_with_history_chunk(items):
+    return [chatbot.analyze_message(message, history) for message, history in items]
+
+
+def _respond_chunk(messages, user_data):
+    return [chatbot.get_response(message, user_data) for message in messages]
+
+
+def _map_chunks(fn, messages, workers, executor, chunk_size, *args):
+    """Yield fn's results for successive chunks of messages, in order. Runs
+    in-process unless an executor is given or workers > 1, and keeps two
+    chunks per worker in flight, so messages can be a lazy iterable.
+    """
+    messages = iter(messages)
+    chunks = iter(lambda: list(itertools.islice(messages, chunk_size)), [])
+    workers = workers or 1
+    if executor is None and workers <= 1:
+        for chunk in chunks:
+            yield from fn(chunk, *args)
+        return
+    pool = executor or _process_pool(workers)
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk, *args))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+
+def analyze_messages_batch(messages, workers=1, executor=None, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield the MessageAnalysis of each message (VADER sentiment and intent,
+    without conversation history), in order, as soon as its chunk is done.
+    With workers > 1 chunks are analyzed in that many worker processes;
+    pass an executor (and its worker count) to share one pool between calls.
+    """
+    return _map_chunks(_analyze_chunk, messages, workers, executor, chunk_size)
+
+
+def get_responses_batch(messages, user_data=None, workers=1, executor=None, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield get_response(message, user_data) for each message, in order.
+    No username is involved, so no per-user state is tracked; see
+    analyze_messages_batch for workers and executor.
+    """
+    return _map_chunks(_respond_chunk, messages, workers, executor, chunk_size, user_data)
+
+
+def relabel_conversations(directory=conversation_store.CONVERSATIONS_DIR, workers=1):
+    """Re-detect the intent and sentiment of every saved message in
+    directory, e.g. after a lexicon change. As in get_response, a message's
+    intent is scored with the user's preceding messages (the last three in
+    the log) as history. Each user's log is rewritten only if a label
+    changed. Returns (users, messages, changed messages).
+    """
+    totals = [0, 0, 0]
+    executor = _process_pool(workers) if workers > 1 else None
+
+    def relabel(entries):
+        relabeled, changed = [], 0
+        messages = [str(entry.get('user_message', '')) for entry in entries]
+        # Each message travels with its history, so the workers score the
+        # history-aware intent
+        items = ((message, messages[max(0, i - 3):i]) for i, message in enumerate(messages))
+        analyses = _map_chunks(_analyze_with_history_chunk, items, workers, executor, BATCH_CHUNK_SIZE)
+        for entry, analysis in zip(entries, analyses):
+            if entry.get('intent') != analysis.intent or entry.get('sentiment') != analysis.sentiment:
+                changed += 1
+                entry = dict(entry, intent=analysis.intent, sentiment=analysis.sentiment)
+            relabeled.append(entry)
+        totals[1] += len(entries)
+        totals[2] += changed
+        return relabeled if changed else None
+
+    try:
+        for username in conversation_store.usernames(directory):
+            conversation_store.rewrite_entries(username, relabel, directory)
+            totals[0] += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return tuple(totals)
+
+
+_IMPORT_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the chatbot's startup timing, or re-label saved conversations.")
+    parser.add_argument("--relabel", action="store_true", help="re-detect intent and sentiment of every saved message")
+    parser.add_argument("--directory", default=conversation_store.CONVERSATIONS_DIR, help="conversation logs to re-label")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for --relabel (0 = one per CPU)")
+    args = parser.parse_args(argv)
+
+    if not args.relabel:
+        for step, value in warm_up().items():
+            print(f"{step:<16}{value}")
+        return
+    started = time.perf_counter()
+    users, messages, changed = relabel_conversations(args.directory, workers=args.workers or os.cpu_count() or 1)
+    print(f"Re-labeled {messages} messages from {users} users in {args.directory} "
+          f"({changed} changed) in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
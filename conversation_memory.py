@@ -0,0 +1,120 @@
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+
+# The chatbot's in-process memory of recent messages. Each user gets a ring
+# buffer of the last MESSAGES_PER_USER messages; users idle for IDLE_SECONDS,
+# and the least recently active ones beyond MAX_USERS, are dropped. The full
+# history is on disk in conversation_store.
+MESSAGES_PER_USER = 50
+MAX_USERS = 1000
+IDLE_SECONDS = 60 * 60
+
+
+class MemoryEntry:
+    """One remembered message; timestamp is in time.time() seconds."""
+    __slots__ = ('message', 'intent', 'sentiment', 'timestamp')
+
+    def __init__(self, message, intent, sentiment, timestamp):
+        self.message = message
+        self.intent = intent
+        self.sentiment = sentiment
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return f"MemoryEntry({self.message!r}, {self.intent!r}, {self.sentiment!r}, {self.timestamp!r})"
+
+
+class _UserMemory:
+    __slots__ = ('entries', 'last_seen')
+
+    def __init__(self, size, now):
+        self.entries = deque(maxlen=size)
+        self.last_seen = now
+
+
+class ConversationMemory:
+    """Recent messages per user, bounded in both users and messages.
+
+    Users are kept in least-recently-active order, so evicting idle ones
+    only looks at the front. on_evict(username) is called for each evicted
+    user so state kept alongside (e.g. emotional state) can go with it.
+    """
+
+    def __init__(self, messages_per_user=MESSAGES_PER_USER, max_users=MAX_USERS, idle_seconds=IDLE_SECONDS,
+                 on_evict=None, clock=time.monotonic):
+        self.messages_per_user = messages_per_user
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self._clock = clock
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def append(self, username, message, intent, sentiment):
+        now = self._clock()
+        with self._lock:
+            memory = self._users.get(username)
+            if memory is None:
+                memory = self._users[username] = _UserMemory(self.messages_per_user, now)
+            else:
+                memory.last_seen = now
+                self._users.move_to_end(username)
+            memory.entries.append(MemoryEntry(message, intent, sentiment, time.time()))
+            evicted = self._evict(now)
+        self._notify(evicted)
+
+    def recent(self, username, n=None):
+        """Return the user's remembered messages, oldest first (the last n if given)."""
+        with self._lock:
+            memory = self._users.get(username)
+            entries = list(memory.entries) if memory else []
+        return entries[-n:] if n else entries
+
+    def evict_idle(self):
+        """Drop users idle for longer than idle_seconds; returns how many."""
+        with self._lock:
+            evicted = self._evict(self._clock())
+        self._notify(evicted)
+        return len(evicted)
+
+    def _evict(self, now):
+        evicted = []
+        while self._users:
+            username, memory = next(iter(self._users.items()))
+            if len(self._users) <= self.max_users and now - memory.last_seen <= self.idle_seconds:
+                break
+            del self._users[username]
+            evicted.append(username)
+        self.evicted += len(evicted)
+        return evicted
+
+    def _notify(self, evicted):
+        if self.on_evict:
+            for username in evicted:
+                self.on_evict(username)
+
+    def __contains__(self, username):
+        return username in self._users
+
+    def __len__(self):
+        return len(self._users)
+
+    def stats(self):
+        """Users and messages held, users evicted so far, and an estimate of
+        the bytes used by the buffers, entries and message strings.
+        """
+        with self._lock:
+            memories = list(self._users.values())
+        entries = [entry for memory in memories for entry in memory.entries]
+        size = sys.getsizeof(self._users)
+        size += sum(sys.getsizeof(memory) + sys.getsizeof(memory.entries) for memory in memories)
+        size += sum(sys.getsizeof(entry) + sys.getsizeof(entry.message) for entry in entries)
+        return {
+            'users': len(memories),
+            'messages': len(entries),
+            'evicted_users': self.evicted,
+            'approx_bytes': size,
+        }
@@ -0,0 +1,517 @@
+import os
+import json
+import atexit
+import logging
+import datetime
+import queue
+import threading
+import time
+from collections import Counter, deque
+from locks import file_lock
+
+# Chat history lives in one JSON-lines log per user. Appending a message
+# writes a single line; the log is trimmed back to MAX_ENTRIES by a
+# background compaction once it holds COMPACT_FACTOR times that many.
+# Histories saved as a JSON array (<user>_chat.json) by older versions are
+# still read, and folded into the log by the first compaction.
+CONVERSATIONS_DIR = 'conversations'
+MAX_ENTRIES = 200
+COMPACT_FACTOR = 2
+
+# Insights are kept as running aggregates over the same retained entries and
+# saved to <user>_insights.json after this many updates; anything appended
+# since is replayed from the log on the next lookup.
+PERSIST_EVERY = 20
+RECENT_DAYS = 30
+EMOTIONAL_HISTORY = 10
+
+# Approximate line count per log, so appends know when to compact without
+# reading the file; seeded from the file on the first append in a process.
+_line_counts = {}
+_compacting = set()
+_state_lock = threading.Lock()
+
+_insights = {}
+_insights_lock = threading.Lock()
+
+# Write-behind: save_entry/save_state queue writes for a background thread,
+# which takes up to BATCH_SIZE at a time and writes each user's share in one
+# append. The queue holds at most MAX_PENDING writes; past that, callers wait
+# for the disk to catch up.
+MAX_PENDING = 1000
+BATCH_SIZE = 100
+WRITE_RETRIES = 3
+RETRY_DELAY = 0.5
+SHUTDOWN_TIMEOUT = 10
+
+# Queued writes that fail for good are logged here
+logger = logging.getLogger(__name__)
+
+_pending = queue.Queue(maxsize=MAX_PENDING)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def log_path(username, directory=CONVERSATIONS_DIR):
+    return os.path.join(directory, f"{username}_chat.jsonl")
+
+
+def legacy_path(username, directory=CONVERSATIONS_DIR):
+    return os.path.join(directory, f"{username}_chat.json")
+
+
+def _read_legacy(path):
+    try:
+        with open(path, 'r') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+def _read_log(path):
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Torn line from a crash mid-append
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def _count_lines(path):
+    try:
+        with open(path, 'rb') as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+
+def read_entries(username, directory=CONVERSATIONS_DIR, limit=MAX_ENTRIES):
+    """Return the user's saved conversation entries, oldest first, at most
+    limit of them (None for all retained entries).
+    """
+    if not os.path.isdir(directory):
+        return []
+    path = log_path(username, directory)
+    with file_lock(path, shared=True):
+        entries = _read_legacy(legacy_path(username, directory)) + _read_log(path)
+    return entries[-limit:] if limit else entries
+
+
+def append_entry(username, entry, directory=CONVERSATIONS_DIR, fsync=False):
+    """Append one conversation entry to the user's log.
+
+    Costs one short write regardless of history length; with fsync=True the
+    entry is on disk when this returns. Starts a background compaction when
+    the log has grown to COMPACT_FACTOR * MAX_ENTRIES lines.
+    """
+    append_entries(username, [entry], directory, fsync)
+
+
+class _WrittenError(OSError):
+    """An append_entries failure after the lines were written (in fsync or
+    the bookkeeping after it), so the write must not be retried.
+    """
+
+
+def append_entries(username, entries, directory=CONVERSATIONS_DIR, fsync=False):
+    """Append entries to the user's log in a single write; see append_entry."""
+    if not entries:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = log_path(username, directory)
+    lines = [(json.dumps(entry) + '\n').encode('utf-8') for entry in entries]
+    written = False
+    try:
+        with file_lock(path):
+            with open(path, 'ab+') as f:
+                if f.tell():
+                    # Start on a fresh line if a crash left the last one unterminated
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        lines[0] = b'\n' + lines[0]
+                start = f.tell()
+                f.write(b''.join(lines))
+                f.flush()
+                written = True
+                if fsync:
+                    os.fsync(f.fileno())
+                inode = os.fstat(f.fileno()).st_ino
+        for entry, line in zip(entries, lines):
+            _fold_appended(username, directory, path, entry, start, start + len(line), inode)
+            start += len(line)
+    except OSError as e:
+        if written:
+            raise _WrittenError(e.errno, e.strerror, e.filename) from e
+        raise
+
+    with _state_lock:
+        if path not in _line_counts:
+            _line_counts[path] = _count_lines(path)
+        else:
+            _line_counts[path] += len(entries)
+        due = _line_counts[path] >= COMPACT_FACTOR * MAX_ENTRIES and path not in _compacting
+        if due:
+            _compacting.add(path)
+    if due:
+        threading.Thread(target=_compact_in_background, args=(username, directory, path), daemon=True,
+                         name='conversation-compaction').start()
+
+
+def _compact_in_background(username, directory, path):
+    try:
+        compact(username, directory)
+    except OSError:
+        # Leave the log as is; the next append past the threshold retries
+        pass
+    finally:
+        with _state_lock:
+            _compacting.discard(path)
+
+
+def compact(username, directory=CONVERSATIONS_DIR, keep=MAX_ENTRIES):
+    """Rewrite the user's log with only the newest keep entries, folding in a
+    legacy JSON history if there is one. Returns the number of entries kept.
+    """
+    return len(rewrite_entries(username, lambda entries: entries[-keep:], directory))
+
+
+def rewrite_entries(username, transform, directory=CONVERSATIONS_DIR):
+    """Replace the user's history with transform(entries), oldest first,
+    folding in a legacy JSON history if there is one. Appends wait until the
+    new log is in place. If transform returns None nothing is written.
+    Returns what was written.
+    """
+    path = log_path(username, directory)
+    legacy = legacy_path(username, directory)
+    with file_lock(path):
+        entries = transform(_read_legacy(legacy) + _read_log(path))
+        if entries is None:
+            return None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if os.path.exists(legacy):
+            os.remove(legacy)
+        st = os.stat(path)
+    with _state_lock:
+        _line_counts[path] = len(entries)
+    with _insights_lock:
+        if path in _insights:
+            _insights[path] = _Insights.from_entries(entries, st.st_ino, st.st_size)
+    return entries
+
+
+def usernames(directory=CONVERSATIONS_DIR):
+    """Users with a saved history in directory, sorted."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    users = set()
+    for name in names:
+        for suffix in ('_chat.jsonl', '_chat.json'):
+            if name.endswith(suffix):
+                users.add(name[:-len(suffix)])
+    return sorted(users)
+
+
+class _Insights:
+    """Running aggregates over a user's retained entries (what read_entries
+    returns): intents, sentiments, per-day intent counts and the latest
+    emotional states. Adding an entry, evicting the oldest one and producing
+    a summary all take constant time.
+
+    inode and offset identify how much of the log has been folded in.
+    """
+
+    def __init__(self, inode=None, offset=0):
+        self.inode = inode
+        self.offset = offset
+        self.unsaved = 0
+        self.window = deque()
+        self.emotional_states = deque(maxlen=EMOTIONAL_HISTORY)
+        self._seq = 0
+        # key -> sequence numbers of its entries in the window, oldest first;
+        # the first one orders ties like a Counter built over the window
+        self._intents = {}
+        self._sentiments = {}
+        self._days = {}
+
+    @classmethod
+    def from_entries(cls, entries, inode, offset):
+        state = cls(inode, offset)
+        for entry in entries[-MAX_ENTRIES:]:
+            state.add_entry(entry)
+        return state
+
+    def add_entry(self, entry):
+        day = str(entry.get('timestamp', ''))[:10]
+        self.add(entry.get('intent', 'general'), entry.get('sentiment', 'neutral'), day)
+        self.emotional_states.append(entry.get('emotional_state', {}))
+
+    def add(self, intent, sentiment, day):
+        if len(self.window) >= MAX_ENTRIES:
+            self._evict()
+        self.window.append((intent, sentiment, day))
+        self._intents.setdefault(intent, deque()).append(self._seq)
+        self._sentiments.setdefault(sentiment, deque()).append(self._seq)
+        bucket = self._days.setdefault(day, {})
+        bucket[intent] = bucket.get(intent, 0) + 1
+        self._seq += 1
+        self.unsaved += 1
+
+    def _evict(self):
+        intent, sentiment, day = self.window.popleft()
+        for positions, key in ((self._intents, intent), (self._sentiments, sentiment)):
+            positions[key].popleft()
+            if not positions[key]:
+                del positions[key]
+        bucket = self._days[day]
+        bucket[intent] -= 1
+        if not bucket[intent]:
+            del bucket[intent]
+            if not bucket:
+                del self._days[day]
+
+    def summary(self, today=None):
+        """Counts ordered by first appearance in the window, as Counter
+        would list them. recent_intents covers entries dated within the last
+        RECENT_DAYS days, counted per whole day.
+        """
+        today = today or datetime.date.today()
+        recent = Counter()
+        for ago in range(RECENT_DAYS, -1, -1):
+            for intent, n in self._days.get((today - datetime.timedelta(days=ago)).isoformat(), {}).items():
+                recent[intent] += n
+        return {
+            'total': len(self.window),
+            'intents': {k: len(v) for k, v in sorted(self._intents.items(), key=lambda kv: kv[1][0])},
+            'sentiments': {k: len(v) for k, v in sorted(self._sentiments.items(), key=lambda kv: kv[1][0])},
+            'recent_intents': recent,
+            'emotional_states': list(self.emotional_states),
+        }
+
+    def to_json(self):
+        return {
+            'inode': self.inode,
+            'offset': self.offset,
+            'window': [list(item) for item in self.window],
+            'emotional_states': list(self.emotional_states),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        state = cls(data['inode'], data['offset'])
+        for intent, sentiment, day in data['window']:
+            state.add(intent, sentiment, day)
+        state.emotional_states.extend(data['emotional_states'])
+        state.unsaved = 0
+        return state
+
+
+def insights_path(username, directory=CONVERSATIONS_DIR):
+    return os.path.join(directory, f"{username}_insights.json")
+
+
+def _save_insights(state, username, directory):
+    path = insights_path(username, directory)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(state.to_json(), f)
+        os.replace(tmp_path, path)
+        state.unsaved = 0
+    except OSError:
+        # Only a cache; it is rebuilt from the log if missing or stale
+        pass
+
+
+def _load_insights(username, directory):
+    try:
+        with open(insights_path(username, directory), 'r') as f:
+            return _Insights.from_json(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _catch_up(state, username, directory, path):
+    """Bring state up to date with the log: replay lines appended since it
+    was saved, or rebuild it if the log was compacted or replaced.
+    """
+    with file_lock(path, shared=True):
+        try:
+            st = os.stat(path)
+            inode, size = st.st_ino, st.st_size
+        except OSError:
+            inode, size = None, 0
+        if state is not None and state.inode == inode and state.offset <= size:
+            if state.offset < size:
+                with open(path, 'rb') as f:
+                    f.seek(state.offset)
+                    tail = f.read(size - state.offset)
+                # Only complete lines; a torn last line waits for its newline
+                tail = tail[:tail.rfind(b'\n') + 1]
+                for line in tail.splitlines():
+                    try:
+                        state.add_entry(json.loads(line))
+                    except ValueError:
+                        continue
+                state.offset += len(tail)
+            return state
+        entries = _read_legacy(legacy_path(username, directory)) + _read_log(path)
+    return _Insights.from_entries(entries, inode, size)
+
+
+def _fold_appended(username, directory, path, entry, start, end, inode):
+    with _insights_lock:
+        state = _insights.get(path)
+        # Fold directly only if nothing was appended in between (e.g. by another process)
+        if state is not None and state.inode == inode and state.offset == start:
+            state.add_entry(entry)
+            state.offset = end
+            if state.unsaved >= PERSIST_EVERY:
+                _save_insights(state, username, directory)
+
+
+def insights(username, directory=CONVERSATIONS_DIR):
+    """Return the running aggregates for the user's retained conversation
+    history (see _Insights.summary), or None if there is none.
+    """
+    if not os.path.isdir(directory):
+        return None
+    path = log_path(username, directory)
+    with _insights_lock:
+        state = _insights.get(path) or _load_insights(username, directory)
+        state = _insights[path] = _catch_up(state, username, directory, path)
+        if state.unsaved >= PERSIST_EVERY:
+            _save_insights(state, username, directory)
+        summary = state.summary()
+    return summary if summary['total'] else None
+
+
+def state_path(username, directory=CONVERSATIONS_DIR):
+    return os.path.join(directory, f"{username}_state.json")
+
+
+def write_state(username, state, directory=CONVERSATIONS_DIR):
+    """Replace the user's saved emotional-state snapshot."""
+    os.makedirs(directory, exist_ok=True)
+    path = state_path(username, directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def read_state(username, directory=CONVERSATIONS_DIR):
+    """Return the user's last saved emotional-state snapshot, or None."""
+    try:
+        with open(state_path(username, directory), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def save_entry(username, entry, directory=CONVERSATIONS_DIR):
+    """Queue a conversation entry to be appended to the user's log by the
+    background writer. Returns at once unless MAX_PENDING writes are already
+    queued, in which case it waits for room. read_entries and insights see
+    the entry once it is written; flush() waits for that.
+    """
+    _enqueue('entry', username, entry, directory)
+
+
+def save_state(username, state, directory=CONVERSATIONS_DIR):
+    """Queue an emotional-state snapshot; only the newest one queued for a
+    user is written.
+    """
+    _enqueue('state', username, dict(state), directory)
+
+
+def _enqueue(kind, username, payload, directory):
+    global _writer
+    # Resolved now, in case the working directory changes before the write
+    directory = os.path.abspath(directory)
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_behind, daemon=True, name='conversation-writer')
+            _writer.start()
+    _pending.put((kind, directory, username, payload))
+
+
+def flush(timeout=None):
+    """Wait until every queued write has been attempted. Returns False if
+    writes were still pending after timeout seconds.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _pending.all_tasks_done:
+        while _pending.unfinished_tasks:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            _pending.all_tasks_done.wait(remaining)
+    return True
+
+
+def _write_behind():
+    while True:
+        batch = [_pending.get()]
+        # Everything queued while the last batch was being written goes in this one
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_batch(batch)
+        finally:
+            for _ in batch:
+                _pending.task_done()
+
+
+def _write_batch(batch):
+    entries, states = {}, {}
+    for kind, directory, username, payload in batch:
+        if kind == 'entry':
+            entries.setdefault((directory, username), []).append(payload)
+        else:
+            states[(directory, username)] = payload
+    for (directory, username), user_entries in entries.items():
+        _with_retries(append_entries, username, user_entries, directory)
+    for (directory, username), state in states.items():
+        _with_retries(write_state, username, state, directory)
+
+
+def _with_retries(write, username, *args):
+    for attempt in range(WRITE_RETRIES):
+        try:
+            write(username, *args)
+            return
+        except _WrittenError as e:
+            # The lines are in the log; writing them again would duplicate them
+            logger.warning("Saved %s for %r, but a later step failed: %s", write.__name__, username, e)
+            return
+        except OSError as e:
+            # Writes queued meanwhile wait, and callers block once the queue fills
+            if attempt + 1 < WRITE_RETRIES:
+                time.sleep(RETRY_DELAY)
+            else:
+                logger.error("Dropped %s for %r after %d attempts: %s", write.__name__, username, WRITE_RETRIES, e)
+        except Exception as e:
+            # Not worth retrying, e.g. an entry that isn't JSON-serializable
+            logger.error("Dropped %s for %r: %s", write.__name__, username, e)
+            return
+
+
+atexit.register(flush, SHUTDOWN_TIMEOUT)
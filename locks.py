@@ -0,0 +1,33 @@
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Shared by the results and conversation stores. Kept apart from both so
+# importing the conversation store (and with it the chatbot) does not pull
+# in pandas.
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """Inter-process lock guarding the file at path (shared for readers),
+    held on a sibling <path>.lock file so the data file itself can be replaced.
+    """
+    with open(f"{path}.lock", 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            # msvcrt only has exclusive locks
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,650 @@
+import os
+import json
+import glob
+import time
+import argparse
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from locks import file_lock
+
+# Survey results live in a Parquet file with compact column types. The CSV
+# the app used to write is still read once and converted on first access.
+RESULTS_PATH = 'student_survey_results.parquet'
+LEGACY_CSV_PATH = 'student_survey_results.csv'
+
+# 1-10 slider answers
+SCALE_COLUMNS = [
+    'Stress_Level', 'Academic_Workload', 'Anxiety_Level', 'Social_Support',
+    'Depression_Level', 'Financial_Stress', 'Relationship_Stress', 'Coping_Frequency',
+    'Screen_Time', 'Nutrition_Quality', 'Self_Esteem', 'Work_Life_Balance', 'Future_Optimism',
+]
+HOUR_COLUMNS = ['Sleep_Hours', 'Exercise_Hours']
+TEXT_COLUMNS = ['Username', 'Name', 'Model_Version']
+# Per-row input hash written by analysis.analyze_data_incremental
+HASH_COLUMN = 'Input_Hash'
+
+# Submissions are appended to a JSON-lines log next to the Parquet file and
+# folded into it by compact_results() once the log reaches this size.
+COMPACT_THRESHOLD_BYTES = 256 * 1024
+
+# One compaction at a time per process; other processes are handled by the
+# file lock and the stat check in compact_results.
+_compaction_lock = threading.Lock()
+
+# Each user's latest submission, for lookups that shouldn't load every
+# result: <stem>.latest.parquet holds the last row per user of the Parquet
+# file (and the file's stat, to detect a stale index); submissions still in
+# the logs are added on load. Kept in memory per path like the frames below.
+_latest_cache = {}
+
+# read_results() frames kept in memory per path, with the stat of the Parquet
+# file and its logs when they were read; see cached_results.
+_results_cache = {}
+_results_cache_lock = threading.Lock()
+
+# Orders of the admin tables' paged view: label -> (column, descending). There
+# is no submission date, but results are stored in submission order, so
+# None sorts by position.
+PAGE_SORTS = {
+    'Newest first': (None, True),
+    'Oldest first': (None, False),
+    'Username': ('Username', False),
+    'Highest risk': ('Risk_Probability', True),
+    'Highest stress': ('Stress_Level', True),
+}
+
+# Row orders (after filtering and sorting) of recent paged views, so turning
+# a page only slices one; keyed by the results' signature, so any write
+# starts afresh.
+ORDER_CACHE_SIZE = 8
+_order_cache = OrderedDict()
+_order_cache_lock = threading.Lock()
+
+ResultsPage = namedtuple('ResultsPage', ['frame', 'positions', 'total', 'page', 'pages'])
+
+# Column order of the admin tables
+RESULT_COLUMNS = [
+    'Username', 'Name', 'Age', 'Stress_Level', 'Sleep_Hours', 'Exercise_Hours',
+    'Academic_Workload', 'Anxiety_Level', 'Social_Support', 'Depression_Level',
+    'Financial_Stress', 'Relationship_Stress', 'Coping_Frequency', 'Screen_Time',
+    'Nutrition_Quality', 'Self_Esteem', 'Work_Life_Balance', 'Future_Optimism',
+    'Recommendation',
+]
+
+
+def _integer_dtype(values, dtype, lo, hi):
+    """Use the nullable integer dtype when every value fits it exactly, so an
+    out-of-range or fractional edit degrades to float32 instead of failing.
+    """
+    present = values[~np.isnan(values)]
+    if present.size and (present.min() < lo or present.max() > hi or not np.array_equal(present, np.round(present))):
+        return 'float32'
+    return dtype
+
+
+def coerce_schema(df):
+    """Return df with the storage dtypes: Int8 scales, Int16 age, float32 hours,
+    string names, Int64 input hashes and a categorical Recommendation.
+    """
+    df = df.copy()
+    for c in df.columns:
+        if c in SCALE_COLUMNS or c == 'Age':
+            values = pd.to_numeric(df[c], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            dtype = 'Int8' if c != 'Age' else 'Int16'
+            lo, hi = (-128, 127) if dtype == 'Int8' else (-32768, 32767)
+            df[c] = pd.array(values, dtype='Float64').astype(_integer_dtype(values, dtype, lo, hi))
+        elif c in HOUR_COLUMNS:
+            df[c] = pd.to_numeric(df[c], errors='coerce').astype('float32')
+        elif c in TEXT_COLUMNS:
+            df[c] = df[c].astype('string')
+        elif c == HASH_COLUMN:
+            values = pd.to_numeric(df[c], errors='coerce')
+            # A hash that went through float64 is no longer exact; drop it so
+            # the row is simply re-analyzed.
+            df[c] = values.astype('Int64') if values.dtype.kind == 'i' else pd.array([pd.NA] * len(df), dtype='Int64')
+        elif c == 'Recommendation' and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype('category')
+    return df
+
+
+def empty_results():
+    """An empty results frame with the storage dtypes."""
+    return coerce_schema(pd.DataFrame({c: pd.Series(dtype='object') for c in RESULT_COLUMNS}))
+
+
+def as_record(row):
+    """Turn a stored row (Series) into a plain dict for code written against
+    the old CSV frames: missing numbers become nan, missing text None.
+    """
+    record = {}
+    for c, v in row.items():
+        if v is pd.NA or v is None or (isinstance(v, float) and np.isnan(v)):
+            v = None if c in TEXT_COLUMNS or c == 'Recommendation' else float('nan')
+        elif isinstance(v, np.generic):
+            v = v.item()
+        record[c] = v
+    return record
+
+
+def _to_arrow(df):
+    import pyarrow as pa
+
+    df = coerce_schema(df)
+    # Parquet dictionary-encodes the text itself; handing it plain strings
+    # keeps the Arrow schema identical across chunks with different categories.
+    if 'Recommendation' in df.columns:
+        df['Recommendation'] = df['Recommendation'].astype(object)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _pending_path(path):
+    return f"{os.path.splitext(path)[0]}.pending.jsonl"
+
+
+def _log_paths(path):
+    """Submission logs not yet folded into the Parquet file, oldest first:
+    segments set aside by a running compaction, then the live log.
+    """
+    stem = os.path.splitext(path)[0]
+    segments = sorted(glob.glob(f"{glob.escape(stem)}.pending.*.jsonl"))
+    pending = _pending_path(path)
+    return segments + [pending] if os.path.exists(pending) else segments
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _read_log(log_path):
+    records = []
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn last line from a crash mid-append
+                continue
+    return pd.DataFrame(records)
+
+
+def _read_parquet(path):
+    return pd.read_parquet(path, engine='pyarrow', read_dictionary=['Recommendation'])
+
+
+def _combine(frames):
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return empty_results()
+    if len(frames) == 1:
+        return frames[0]
+    # Coerce first so nullable columns missing from some frames stay exact
+    # (e.g. Input_Hash would otherwise go through float64)
+    return coerce_schema(pd.concat([coerce_schema(f) for f in frames], ignore_index=True))
+
+
+def read_results(path=RESULTS_PATH, legacy_csv_path=LEGACY_CSV_PATH):
+    """Load every stored survey result, including submissions not yet compacted.
+
+    Falls back to converting the legacy CSV the first time, and to an empty
+    frame when nothing has been saved yet.
+    """
+    if not os.path.exists(path) and legacy_csv_path and os.path.exists(legacy_csv_path):
+        with file_lock(path):
+            if not os.path.exists(path):
+                _write_table(pd.read_csv(legacy_csv_path), path)
+    with file_lock(path, shared=True):
+        frames = [_read_parquet(path)] if os.path.exists(path) else []
+        frames.extend(_read_log(p) for p in _log_paths(path))
+    return _combine(frames)
+
+
+def _signature(path):
+    return _stat(path), tuple((p, _stat(p)) for p in _log_paths(path))
+
+
+def cached_results(path=RESULTS_PATH, legacy_csv_path=LEGACY_CSV_PATH):
+    """read_results, served from memory while the Parquet file and its logs
+    keep the same inode, mtime and size, and no write went through this
+    module. Returns a shallow copy; with copy-on-write (always on from
+    pandas 3, which requirements.txt asks for), changes to it leave the
+    cached frame alone.
+    """
+    return _cached(path, legacy_csv_path)[1].copy(deep=False)
+
+
+def _cached(path, legacy_csv_path=LEGACY_CSV_PATH):
+    # The cached (signature, frame) pair; the frame must not be modified
+    key = os.path.abspath(path)
+    signature = _signature(path)
+    with _results_cache_lock:
+        cached = _results_cache.get(key)
+    if cached is None or cached[0] != signature:
+        # Stored under the stat from before the read, so a write that lands
+        # during it only costs another read
+        cached = (signature, read_results(path, legacy_csv_path))
+        with _results_cache_lock:
+            _results_cache[key] = cached
+    return cached
+
+
+def _invalidate(path):
+    with _results_cache_lock:
+        _results_cache.pop(os.path.abspath(path), None)
+
+
+def iter_results(path=RESULTS_PATH, batch_size=50_000):
+    """Yield stored results as DataFrames of at most batch_size rows.
+    Uncompacted submissions come last, as one extra batch.
+    """
+    import pyarrow.parquet as pq
+
+    # Open the file and read the (small) logs under the lock so the batches
+    # form one consistent snapshot even if a compaction swaps files meanwhile.
+    with file_lock(path, shared=True):
+        pf = pq.ParquetFile(path, read_dictionary=['Recommendation']) if os.path.exists(path) else None
+        logs = [_read_log(p) for p in _log_paths(path)]
+    if pf is not None:
+        for batch in pf.iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    tail = _combine(logs)
+    if len(tail):
+        yield tail
+
+
+def _page_order(df, username, sort):
+    positions = np.arange(len(df))
+    if username and 'Username' not in df.columns:
+        # e.g. a batch upload of the raw survey: no row can match
+        positions = positions[:0]
+    elif username:
+        matches = df['Username'].str.contains(username, case=False, regex=False)
+        positions = positions[matches.fillna(False).to_numpy(dtype=bool)]
+    column, descending = PAGE_SORTS[sort]
+    if column is None:
+        return positions[::-1] if descending else positions
+    if column not in df.columns:
+        return positions
+    values = df[column].take(positions).reset_index(drop=True)
+    order = values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+    return positions[order]
+
+
+def results_page(page=1, page_size=50, username='', sort='Newest first', path=RESULTS_PATH):
+    """One page of the stored results for the admin tables.
+
+    Rows whose Username contains username (ignoring case) are ordered by
+    sort (a PAGE_SORTS label); only the rows of the requested page are
+    copied out. Returns a ResultsPage whose positions are the page rows'
+    positions in read_results(), for apply_edits; page is clamped to the
+    pages there are.
+    """
+    signature, df = _cached(path)
+    key = (os.path.abspath(path), signature, username, sort)
+    with _order_cache_lock:
+        positions = _order_cache.get(key)
+        if positions is not None:
+            _order_cache.move_to_end(key)
+    if positions is None:
+        positions = _page_order(df, username, sort)
+        with _order_cache_lock:
+            _order_cache[key] = positions
+            while len(_order_cache) > ORDER_CACHE_SIZE:
+                _order_cache.popitem(last=False)
+    pages = max(1, -(-len(positions) // page_size))
+    page = min(max(1, page), pages)
+    rows = positions[(page - 1) * page_size:page * page_size]
+    return ResultsPage(df.take(rows).reset_index(drop=True), rows, len(positions), page, pages)
+
+
+def apply_edits(positions, edits, path=RESULTS_PATH):
+    """Save the changes made in a data editor showing the rows at positions
+    (from results_page). edits is the editor's state: edited_rows, keyed by
+    row number in the page, added_rows and deleted_rows. Added rows with no
+    values are skipped. Returns the number of results written; submissions
+    logged since the page was read are kept as well.
+    """
+    df, version = snapshot_results(path)
+    edited = edits.get('edited_rows', {})
+    for column in {c for changes in edited.values() for c in changes}:
+        # As objects, so any edit fits; write_results restores the dtypes
+        values = df[column].astype(object).to_numpy(copy=True)
+        for row, changes in edited.items():
+            if column in changes:
+                values[positions[int(row)]] = changes[column]
+        df[column] = values
+    deleted = [positions[int(row)] for row in edits.get('deleted_rows', [])]
+    if deleted:
+        df = df.drop(index=df.index[deleted])
+    added = [row for row in edits.get('added_rows', []) if any(v is not None and v != '' for v in row.values())]
+    if added:
+        df = pd.concat([df, pd.DataFrame(added)], ignore_index=True)
+    write_results(df.reset_index(drop=True), path, based_on=version)
+    return len(df)
+
+
+def _write_parquet(df, path):
+    import pyarrow.parquet as pq
+
+    pq.write_table(_to_arrow(df), path, compression='zstd')
+
+
+def _write_table(df, path):
+    tmp_path = f"{path}.tmp"
+    _write_parquet(df, tmp_path)
+    os.replace(tmp_path, path)
+    index = _LatestIndex.from_results(coerce_schema(df))
+    _write_index(path, index)
+    return index
+
+
+class _LatestIndex:
+    """Each user's last row: a frame of those rows found by position, plus
+    records for submissions added since the frame was built.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.positions = dict(zip(frame['Username'], range(len(frame)))) if 'Username' in frame.columns else {}
+        self.records = {}
+
+    @classmethod
+    def from_results(cls, df):
+        if 'Username' not in df.columns:
+            return cls(empty_results())
+        return cls(df[df['Username'].notna()].drop_duplicates('Username', keep='last').reset_index(drop=True))
+
+    def add(self, df):
+        latest = self.from_results(df).frame
+        for i in range(len(latest)):
+            record = as_record(latest.iloc[i])
+            self.records[record['Username']] = record
+
+    def get(self, username):
+        record = self.records.get(username)
+        if record is None and username in self.positions:
+            # Converted once; the chat page asks for the same user on every rerun
+            record = self.records[username] = as_record(self.frame.iloc[self.positions[username]])
+        return dict(record) if record is not None else None
+
+
+_INDEX_STAT_KEY = b'results_stat'
+
+
+def _index_path(path):
+    return f"{os.path.splitext(path)[0]}.latest.parquet"
+
+
+def _write_index(path, index):
+    """Save index.frame as the latest-row index of the Parquet file at path
+    as it is now; callers hold the store lock or have just built the index
+    from the file.
+    """
+    import pyarrow.parquet as pq
+
+    table = _to_arrow(index.frame)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _INDEX_STAT_KEY: json.dumps(_stat(path)).encode()})
+    index_path = _index_path(path)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, index_path)
+
+
+def _read_index(path):
+    """The persisted index if it matches the Parquet file at path, else None."""
+    import pyarrow.parquet as pq
+
+    try:
+        table = pq.read_table(_index_path(path), read_dictionary=['Recommendation'])
+        stat = json.loads((table.schema.metadata or {})[_INDEX_STAT_KEY])
+    except (OSError, ValueError, KeyError):
+        return None
+    if tuple(stat or ()) != tuple(_stat(path) or ()):
+        return None
+    return _LatestIndex(table.to_pandas())
+
+
+def _load_latest(path):
+    with file_lock(path, shared=True):
+        signature = _signature(path)
+        index = _read_index(path) if _stat(path) else _LatestIndex(empty_results())
+        if index is None:
+            # Missing or stale (e.g. the Parquet file came from elsewhere)
+            index = _LatestIndex.from_results(_read_parquet(path))
+            _write_index(path, index)
+        for log_path in _log_paths(path):
+            index.add(coerce_schema(_read_log(log_path)))
+    return signature, index
+
+
+def latest_submission(username, path=RESULTS_PATH, legacy_csv_path=LEGACY_CSV_PATH):
+    """The user's most recent stored submission as a record (see as_record),
+    or None. Served from the per-user index, so the cost does not grow with
+    the number of stored results.
+    """
+    if not os.path.exists(path) and legacy_csv_path and os.path.exists(legacy_csv_path):
+        # Converts the legacy CSV, writing the index with it
+        read_results(path, legacy_csv_path)
+    key = os.path.abspath(path)
+    signature = _signature(path)
+    with _results_cache_lock:
+        cached = _latest_cache.get(key)
+    if cached is None or cached[0] != signature:
+        cached = _load_latest(path)
+        with _results_cache_lock:
+            _latest_cache[key] = cached
+    return cached[1].get(username)
+
+
+def _update_latest(path, before, index=None, added=None):
+    """After a write through this module, store index as the in-memory index,
+    or add the submissions in the frame added to the current one if it was up
+    to date before the write; otherwise the next lookup reloads.
+    """
+    key = os.path.abspath(path)
+    with _results_cache_lock:
+        cached = _latest_cache.get(key)
+        if index is None and cached is not None and cached[0] == before:
+            index = cached[1]
+            if added is not None:
+                index.add(added)
+        if index is not None:
+            _latest_cache[key] = (_signature(path), index)
+        else:
+            _latest_cache.pop(key, None)
+
+
+class ResultsChanged(Exception):
+    """The stored results were rewritten (or compacted) after the snapshot a
+    write was based on was read; the write would lose those changes.
+    """
+
+
+def _keep_new_submissions(path, based_on):
+    # Logs are append-only and, while the Parquet file is unchanged, none of
+    # the logs in based_on was removed, so each holds what was read as a
+    # prefix (matched by inode: compaction renames the live log). Keep only
+    # what was appended after it; logs started since are kept whole.
+    read_sizes = {stat[0]: stat[2] for _, stat in based_on[1] if stat}
+    for log_path in _log_paths(path):
+        stat = _stat(log_path)
+        read_size = read_sizes.get(stat[0]) if stat else None
+        if read_size is None:
+            continue
+        if stat[2] <= read_size:
+            os.remove(log_path)
+            continue
+        with open(log_path, 'rb') as f:
+            f.seek(read_size)
+            tail = f.read()
+        tmp_path = f"{log_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(tail)
+        os.replace(tmp_path, log_path)
+
+
+def snapshot_results(path=RESULTS_PATH, legacy_csv_path=LEGACY_CSV_PATH):
+    """cached_results and the version of the store it was read at, to pass
+    as write_results' based_on when writing back a changed copy.
+    """
+    signature, df = _cached(path, legacy_csv_path)
+    return df.copy(deep=False), signature
+
+
+def write_results(df, path=RESULTS_PATH, based_on=None):
+    """Replace the stored results with df, atomically.
+
+    With based_on (from snapshot_results), df is taken to hold the results
+    as of that snapshot: submissions logged since are kept, and
+    ResultsChanged is raised if the Parquet file was replaced meanwhile.
+    Without it, df replaces everything, logged submissions included.
+    """
+    with file_lock(path):
+        if based_on is not None and _stat(path) != based_on[0]:
+            raise ResultsChanged(f"{path} changed since it was read")
+        index = _write_table(df, path)
+        if based_on is None:
+            for log_path in _log_paths(path):
+                os.remove(log_path)
+        else:
+            _keep_new_submissions(path, based_on)
+            for log_path in _log_paths(path):
+                index.add(coerce_schema(_read_log(log_path)))
+        _invalidate(path)
+        _update_latest(path, None, index)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA:
+        return None
+    return str(value)
+
+
+def append_submission(record, path=RESULTS_PATH, fsync=True):
+    """Store one analyzed survey submission.
+
+    The record is appended as a single JSON line under the store lock, so the
+    cost does not depend on how many results exist. Once the log passes
+    COMPACT_THRESHOLD_BYTES a background thread folds it into the Parquet file.
+    """
+    line = json.dumps(record, default=_json_default) + '\n'
+    added = coerce_schema(pd.DataFrame([record]))
+    with file_lock(path):
+        before = _signature(path)
+        with open(_pending_path(path), 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            size = f.tell()
+        _invalidate(path)
+        _update_latest(path, before, added=added)
+    if size >= COMPACT_THRESHOLD_BYTES and not _compaction_lock.locked():
+        threading.Thread(target=compact_results, args=(path,), daemon=True, name='results-compaction').start()
+
+
+def compact_results(path=RESULTS_PATH):
+    """Fold logged submissions into the Parquet file; returns the rows folded in.
+
+    The live log is renamed to a segment under the lock, the merged file is
+    written without holding it, and the swap happens under the lock again so
+    readers see either the old file plus segments or the new file alone. If
+    the results were rewritten meanwhile the merge is dropped and the
+    segments wait for the next compaction.
+    """
+    if not _compaction_lock.acquire(blocking=False):
+        return 0
+    try:
+        with file_lock(path):
+            pending = _pending_path(path)
+            if os.path.exists(pending) and os.path.getsize(pending):
+                os.replace(pending, f"{os.path.splitext(path)[0]}.pending.{time.time_ns()}.jsonl")
+            segments = [p for p in _log_paths(path) if p != pending]
+            base_stat = _stat(path)
+        if not segments:
+            return 0
+
+        logs = [_read_log(p) for p in segments]
+        merged = _combine(([_read_parquet(path)] if base_stat else []) + logs)
+        tmp_path = f"{path}.compact.tmp"
+        _write_parquet(merged, tmp_path)
+
+        with file_lock(path):
+            if _stat(path) != base_stat:
+                os.remove(tmp_path)
+                return 0
+            before = _signature(path)
+            os.replace(tmp_path, path)
+            for segment in segments:
+                if os.path.exists(segment):
+                    os.remove(segment)
+            _invalidate(path)
+            _write_index(path, _LatestIndex.from_results(merged))
+            # Same submissions, different files
+            _update_latest(path, before)
+        return sum(len(log) for log in logs)
+    finally:
+        _compaction_lock.release()
+
+
+class ResultsWriter:
+    """Append DataFrames to one Parquet file, one row group per write.
+    Later frames are cast to the schema of the first.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+
+    def write(self, df):
+        import pyarrow.parquet as pq
+
+        table = _to_arrow(df)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_csv(csv_path=LEGACY_CSV_PATH, path=RESULTS_PATH):
+    """One-time conversion of a results CSV into the Parquet store.
+    Returns the number of rows converted; the CSV is left in place.
+    """
+    df = pd.read_csv(csv_path)
+    with file_lock(path):
+        _write_table(df, path)
+    return len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a survey results CSV into the Parquet results store.")
+    parser.add_argument("csv", nargs="?", default=LEGACY_CSV_PATH, help="results CSV to convert")
+    parser.add_argument("output", nargs="?", default=RESULTS_PATH, help="Parquet file to write")
+    args = parser.parse_args(argv)
+
+    rows = convert_csv(args.csv, args.output)
+    csv_size, parquet_size = os.path.getsize(args.csv), os.path.getsize(args.output)
+    print(f"Converted {rows} rows: {csv_size} bytes CSV -> {parquet_size} bytes Parquet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+
+from user_store import USERS_DB, revoke_session, session_revoked
+
+# Login sessions are signed tokens carried in the page URL (?user=...&token=...),
+# so checking one is an HMAC over a few fields: nothing is stored per session
+# and nothing is read or written on a rerun. Only logged-out tokens are
+# recorded, in the user database, until they expire. A token is
+# "<expiry>.<signature>", signed over the username, the expiry and the
+# account's password, so changing the password ends the user's sessions.
+SESSION_TTL = 24 * 60 * 60
+
+# The signing key comes from SESSION_SECRET, or else from this file, which is
+# created with a random key the first time it is needed
+SECRET_PATH = '.session_secret'
+
+_secret = None
+_secret_lock = threading.Lock()
+
+
+def _load_secret(path):
+    try:
+        with open(path, 'rb') as f:
+            secret = f.read()
+        if secret:
+            return secret
+    except OSError:
+        pass
+    secret = os.urandom(32).hex().encode()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process created it first
+        with open(path, 'rb') as f:
+            return f.read()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(secret)
+    return secret
+
+
+def secret_key(path=SECRET_PATH):
+    """The key tokens are signed with, loaded once per process."""
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                env = os.environ.get('SESSION_SECRET')
+                _secret = env.encode() if env else _load_secret(path)
+    return _secret
+
+
+def _signature(username, expires, password):
+    message = f"{username}\0{expires}\0{password}".encode()
+    return hmac.new(secret_key(), message, hashlib.sha256).hexdigest()
+
+
+def issue_token(username, password, ttl=SESSION_TTL, now=None):
+    """A token for username that is valid for ttl seconds."""
+    expires = int((time.time() if now is None else now) + ttl)
+    return f"{expires}.{_signature(username, expires, password)}"
+
+
+def token_expiry(token):
+    """The expiry time of a well-formed token, else None (not verified)."""
+    try:
+        expires, _ = token.split('.', 1)
+        return int(expires)
+    except (AttributeError, ValueError):
+        return None
+
+
+def verify_token(username, token, account, now=None, path=USERS_DB):
+    """True if token is a current, unrevoked session token for username,
+    whose stored account (see user_store.get_user) is account.
+    """
+    now = time.time() if now is None else now
+    expires = token_expiry(token)
+    if expires is None or expires <= now or not account:
+        return False
+    signature = token.split('.', 1)[1]
+    if not hmac.compare_digest(signature, _signature(username, expires, account.get('password', ''))):
+        return False
+    return not session_revoked(token, path)
+
+
+def needs_refresh(token, ttl=SESSION_TTL, now=None):
+    """True once less than half of a token's lifetime is left."""
+    expires = token_expiry(token)
+    return expires is None or expires - (time.time() if now is None else now) < ttl / 2
+
+
+def revoke_token(token, now=None, path=USERS_DB):
+    """Stop token from being accepted (on logout), in every server process
+    sharing the user database, until it expires.
+    """
+    expires = token_expiry(token)
+    now = time.time() if now is None else now
+    if expires is not None and expires > now:
+        revoke_session(token, expires, now, path)
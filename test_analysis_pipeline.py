@@ -0,0 +1,105 @@
+"""
+Checks that the batch analysis modes agree with analyze_data on a whole frame
+"""
+import pandas as pd
+import pytest
+from analysis import analyze_data, analyze_data_incremental, analyze_data_parallel, analyze_file
+from results_store import read_results, write_results
+from test_recommendations import make_surveys
+
+
+def test_streamed_file_matches_in_memory_analysis(tmp_path):
+    src = tmp_path / "survey.csv"
+    out = tmp_path / "results.csv"
+    make_surveys(1000, seed=7).to_csv(src, index=False)
+
+    assert analyze_file(src, out, chunksize=128) == 1000
+    expected = analyze_data(pd.read_csv(src))
+    pd.testing.assert_frame_equal(pd.read_csv(out), expected, check_dtype=False)
+    assert not (tmp_path / "results.csv.tmp").exists()
+
+
+def test_parallel_analysis_keeps_row_order():
+    df = make_surveys(30000, seed=8)
+    df.index = df.index[::-1]
+    expected = analyze_data(df.copy())
+    result = analyze_data_parallel(df, workers=2, chunk_size=4000)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_streamed_file_with_workers(tmp_path):
+    src = tmp_path / "survey.csv"
+    out = tmp_path / "results.csv"
+    make_surveys(3000, seed=9).to_csv(src, index=False)
+
+    assert analyze_file(src, out, chunksize=500, workers=2) == 3000
+    pd.testing.assert_frame_equal(pd.read_csv(out), analyze_data(pd.read_csv(src)), check_dtype=False)
+
+
+def test_incremental_analysis_only_recomputes_changed_rows(tmp_path):
+    df = make_surveys(2000, seed=10)
+    first, counts = analyze_data_incremental(df)
+    assert counts == {'recomputed': 2000, 'reused': 0}
+    pd.testing.assert_frame_equal(first.drop(columns=['Input_Hash', 'Model_Version']), analyze_data(df.copy()), check_dtype=False)
+
+    # Stored and read back, then one answer edited
+    write_results(first, tmp_path / "results.parquet")
+    stored = read_results(tmp_path / "results.parquet", legacy_csv_path=None)
+    stored.loc[7, 'Stress_Level'] = 10 if stored.loc[7, 'Stress_Level'] != 10 else 1
+    second, counts = analyze_data_incremental(stored)
+    assert counts == {'recomputed': 1, 'reused': 1999}
+    expected = analyze_data(stored.drop(columns=['Input_Hash', 'Model_Version', 'Recommendation']))
+    assert (second['Recommendation'] == expected['Recommendation']).all()
+
+
+def test_incremental_file_analysis_reports_counts(tmp_path):
+    src = tmp_path / "survey.csv"
+    first = tmp_path / "first.parquet"
+    make_surveys(1500, seed=11).to_csv(src, index=False)
+    analyze_file(src, first, chunksize=400, incremental=True)
+
+    stats = {}
+    assert analyze_file(first, tmp_path / "second.parquet", chunksize=400, incremental=True, stats=stats) == 1500
+    assert stats == {'recomputed': 0, 'reused': 1500}
+
+
+def test_incremental_analysis_retries_rows_that_missed_a_score():
+    df = make_surveys(50, seed=12)
+    first, _ = analyze_data_incremental(df)
+    if not first['Model_Version'].iloc[0]:
+        pytest.skip("trained model not available")
+
+    # A blank answer (e.g. a partial row from the admin editor) fails scoring
+    edited = first.copy()
+    edited['Stress_Level'] = edited['Stress_Level'].astype('float64')
+    edited.loc[3, 'Stress_Level'] = float('nan')
+    second, counts = analyze_data_incremental(edited)
+    assert counts['recomputed'] == 1
+    assert pd.isna(second.loc[3, 'Risk_Probability']) and second.loc[3, 'Model_Version'] == ''
+    assert (second.drop(index=3)['Risk_Probability'] == first.drop(index=3)['Risk_Probability']).all()
+
+    # Once filled in, the row is scored again
+    second.loc[3, 'Stress_Level'] = 9
+    third, counts = analyze_data_incremental(second)
+    assert counts['recomputed'] == 1
+    expected = analyze_data(second.drop(columns=['Risk_Probability', 'Input_Hash', 'Model_Version']).loc[[3]].copy())
+    assert third.loc[3, 'Risk_Probability'] == expected.loc[3, 'Risk_Probability']
+    assert third.loc[3, 'Model_Version'] == first.loc[3, 'Model_Version']
+
+
+def test_streamed_file_scores_rows_around_a_blank_one(tmp_path):
+    src = tmp_path / "survey.csv"
+    out = tmp_path / "results.csv"
+    df = make_surveys(300, seed=13)
+    df['Stress_Level'] = df['Stress_Level'].astype('float64')
+    df.loc[5, 'Stress_Level'] = float('nan')
+    df.to_csv(src, index=False)
+    if 'Risk_Probability' not in analyze_data(df.copy()).columns:
+        pytest.skip("trained model not available")
+
+    # The blank row is in the first chunk; only that row goes unscored
+    analyze_file(src, out, chunksize=100)
+    risk = pd.read_csv(out)['Risk_Probability']
+    assert risk.isna().tolist() == [i == 5 for i in range(300)]
+    expected = analyze_data(df.drop(index=5).copy())['Risk_Probability']
+    assert risk.drop(index=5).to_numpy() == pytest.approx(expected.to_numpy())
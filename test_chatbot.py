@@ -0,0 +1,135 @@
+"""
+Checks the chatbot's message analysis: keyword matching, intent priority and reuse
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import pytest
+
+import chatbot
+
+# Keyword matching and intents work without NLTK data; sentiment needs the
+# VADER lexicon
+try:
+    chatbot.vader_analyzer()
+    HAVE_VADER = True
+except LookupError:
+    HAVE_VADER = False
+needs_vader = pytest.mark.skipif(not HAVE_VADER, reason="NLTK vader_lexicon not installed")
+
+LEXICONS = dict(crisis=chatbot.CRISIS_KEYWORDS, headache=chatbot.HEADACHE_KEYWORDS, **chatbot.INTENT_KEYWORDS)
+
+
+def expected_counts(text):
+    return {name: sum(keyword in text for keyword in words) for name, words in LEXICONS.items()}
+
+
+def test_counts_match_substring_tests():
+    keywords = [k for words in LEXICONS.values() for k in words]
+    filler = ['i', 'am', 'so', 'studied', 'feelings', 'head', 'hurts', 'not', 'worth', 'living', 'ing', 'ed', 's']
+    rng = random.Random(0)
+    for _ in range(5000):
+        words = [rng.choice(keywords if rng.random() < 0.3 else filler) for _ in range(rng.randint(0, 10))]
+        text = rng.choice([' ', '']).join(words)
+        counts = chatbot._INTENT_MATCHER.counts(text)
+        assert {name: counts[name] for name in LEXICONS} == expected_counts(text), text
+
+
+def test_overlapping_and_nested_keywords():
+    counts = chatbot._INTENT_MATCHER.counts("my head hurtstressed feelings, life not worth living")
+    assert counts == {k: v for k, v in expected_counts("my head hurtstressed feelings, life not worth living").items() if v}
+    assert chatbot._INTENT_MATCHER.keywords("feeling") == {'feel', 'feeling'}
+
+
+def test_priority_order():
+    bot = chatbot.chatbot
+    assert bot.detect_intent_advanced("hi there") == 'casual_greeting'
+    assert bot.detect_intent_advanced("I want to die, my head hurts") == 'crisis'
+    assert bot.detect_intent_advanced("stressed, anxious and a headache") == 'headache'
+    # Ties go to the earlier intent: mood before depression for 'sad'
+    assert bot.detect_intent_advanced("so sad") == 'mood'
+    assert bot.detect_intent_advanced("nothing much") == 'general'
+
+
+def test_history_boosts_recurring_topics():
+    bot = chatbot.chatbot
+    assert bot.detect_intent_advanced("I can't sleep") == 'sleep'
+    history = ["worried and nervous", "panic attack", "ok"]
+    assert bot.detect_intent_advanced("I can't sleep", history) == 'anxiety'
+    # Only the last three messages count
+    assert bot.detect_intent_advanced("I can't sleep", history + ["a", "b", "c"]) == 'sleep'
+
+
+@needs_vader
+def test_message_analysis_is_computed_once(tmp_path, monkeypatch):
+    bot = chatbot.AdvancedMentalHealthChatbot()
+    calls = []
+    analyze = bot.analyze_sentiment_advanced
+    monkeypatch.setattr(bot, 'analyze_sentiment_advanced', lambda text: calls.append(text) or analyze(text))
+    monkeypatch.chdir(tmp_path)
+
+    response = bot.get_response("I'm feeling stressed", username='student')
+    bot.save_conversation('student', "I'm feeling stressed", response)
+    bot.get_response("I'm  feeling stressed ", username='student', conversation_history=["worried"])
+    assert calls == ["I'm feeling stressed"]
+    assert response['analysis'].intent == 'mood'
+
+
+def test_import_defers_nltk(tmp_path):
+    # Intent detection doesn't need NLTK at all, and the chatbot never needs pandas
+    code = ("import sys, chatbot; chatbot.chatbot.get_user_insights('nobody'); "
+            "chatbot.chatbot.detect_intent_advanced('I can not sleep', ['so stressed']); "
+            "print('nltk' in sys.modules or 'pandas' in sys.modules)")
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(chatbot.__file__)))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=tmp_path, env=env)
+    assert result.stdout.strip() == 'False'
+
+
+@needs_vader
+def test_feature_stage_is_shared():
+    bot = chatbot.AdvancedMentalHealthChatbot()
+    chatbot.message_features.cache_clear()
+    bot.detect_intent_advanced("Worried about exams", ["so stressed"])
+    bot.analyze_message("Worried about exams")
+    # One entry per distinct text, whichever stage asked first
+    assert chatbot.message_features.cache_info().currsize == 2
+    assert chatbot.message_features("Worried about exams").counts == {'anxiety': 1}
+
+
+@needs_vader
+def test_batch_analysis_matches_single_messages(tmp_path):
+    bot = chatbot.AdvancedMentalHealthChatbot()
+    messages = [f"{word} message {i}" for i, word in enumerate(["stressed", "hello", "can't sleep", "so happy"] * 50)]
+    expected = [bot.analyze_message(m) for m in messages]
+    assert list(chatbot.analyze_messages_batch(iter(messages), chunk_size=7)) == expected
+    assert list(chatbot.analyze_messages_batch(messages, workers=2)) == expected
+    responses = list(chatbot.get_responses_batch(["what is mental health", "I'm stressed"]))
+    assert responses[0]['message'].startswith("Mental health includes")
+    assert [r['analysis'].intent for r in responses] == ['general', 'stress']
+
+    store = chatbot.conversation_store
+    (tmp_path / "ivy_chat.json").write_text(json.dumps([{'user_message': "I'm so stressed", 'intent': 'general', 'sentiment': 'neutral'}]))
+    store.append_entry('jack', {'user_message': 'see you tomorrow', 'intent': 'general', 'sentiment': 'neutral'}, directory=tmp_path)
+    assert chatbot.relabel_conversations(tmp_path) == (2, 2, 1)
+    assert store.read_entries('ivy', directory=tmp_path)[0]['intent'] == 'stress'
+    assert chatbot.relabel_conversations(tmp_path) == (2, 2, 0)
+
+
+@needs_vader
+def test_relabel_keeps_history_aware_intents(tmp_path):
+    bot = chatbot.AdvancedMentalHealthChatbot()
+    messages = ["I'm so stressed and overwhelmed", "I feel anxious and overwhelmed", "the deadline is tomorrow"]
+    entries = []
+    for i, message in enumerate(messages):
+        response = bot.get_response(message, conversation_history=messages[:i])
+        entries.append({'user_message': message, 'intent': response['analysis'].intent,
+                        'sentiment': response['analysis'].sentiment})
+    # The history boost is what labels the second message
+    assert entries[1]['intent'] != bot.analyze_message(messages[1]).intent
+    chatbot.conversation_store.append_entries('kim', entries, directory=tmp_path)
+
+    # Unchanged lexicon: nothing to rewrite, whether or not workers do the scoring
+    assert chatbot.relabel_conversations(tmp_path) == (1, 3, 0)
+    assert chatbot.relabel_conversations(tmp_path, workers=2) == (1, 3, 0)
@@ -0,0 +1,58 @@
+"""
+Stress test of the shared chatbot's per-user state under concurrent sessions
+"""
+import sys
+import threading
+import chatbot
+
+THREADS = 16
+UPDATES = 500
+ROUNDS = 20
+START = -100_000
+
+
+def hammer(bot, users, barrier):
+    # Everyone's first message for a user whose state is loaded from disk
+    for r in range(ROUNDS):
+        barrier.wait()
+        bot.update_emotional_state(f"returning{r}", 'stress', 'negative')
+    for i in range(UPDATES):
+        username = users[i % len(users)]
+        bot.update_emotional_state(username, 'stress', 'negative')
+        bot.update_emotional_state(username, 'anxiety', 'neutral')
+        bot.conversation_memory.append(username, f"message {i}", 'stress', 'negative')
+
+
+def test_concurrent_sessions_lose_no_updates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bot = chatbot.AdvancedMentalHealthChatbot()
+    shared = ['shared']
+    own = [[f"user{t}"] for t in range(THREADS)]
+    for username in shared + [users[0] for users in own]:
+        # Far below the cap of 10, so every increment shows
+        bot.emotional_states[username] = {'current_mood': 'neutral', 'stress_level': START, 'anxiety_level': START}
+    for r in range(ROUNDS):
+        chatbot.conversation_store.write_state(f"returning{r}", {'current_mood': 'neutral', 'stress_level': START, 'anxiety_level': 5})
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        barrier = threading.Barrier(THREADS * 2)
+        threads = [threading.Thread(target=hammer, args=(bot, users, barrier)) for users in own]
+        threads += [threading.Thread(target=hammer, args=(bot, shared, barrier)) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    state = bot.emotional_state('shared')
+    assert state['stress_level'] == state['anxiety_level'] == START + THREADS * UPDATES
+    for users in own:
+        assert bot.emotional_state(users[0])['stress_level'] == START + UPDATES
+    for r in range(ROUNDS):
+        assert bot.emotional_state(f"returning{r}")['stress_level'] == START + THREADS * 2
+    stats = bot.memory_stats()
+    assert stats['users'] == THREADS + 1 and stats['emotional_states'] == THREADS + 1 + ROUNDS
+    assert len(bot.conversation_memory.recent('shared')) == bot.conversation_memory.messages_per_user
@@ -0,0 +1,50 @@
+"""
+Checks the chatbot's bounded per-user conversation memory
+"""
+from conversation_memory import ConversationMemory
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keeps_the_last_messages_per_user():
+    memory = ConversationMemory(messages_per_user=3)
+    for i in range(5):
+        memory.append('alice', f"message {i}", 'general', 'neutral')
+    assert [e.message for e in memory.recent('alice')] == ['message 2', 'message 3', 'message 4']
+    assert [e.message for e in memory.recent('alice', 1)] == ['message 4']
+    assert memory.recent('nobody') == []
+
+
+def test_evicts_idle_and_least_recent_users():
+    clock, evicted = Clock(), []
+    memory = ConversationMemory(max_users=2, idle_seconds=100, on_evict=evicted.append, clock=clock)
+    memory.append('alice', 'hi', 'greeting', 'neutral')
+    clock.now = 10
+    memory.append('bob', 'hi', 'greeting', 'neutral')
+    clock.now = 20
+    memory.append('alice', 'again', 'general', 'neutral')
+    memory.append('carol', 'hi', 'greeting', 'neutral')
+    # bob was the least recently active
+    assert evicted == ['bob'] and 'alice' in memory and 'carol' in memory
+
+    clock.now = 115
+    assert memory.evict_idle() == 0
+    clock.now = 121
+    assert memory.evict_idle() == 2
+    assert evicted == ['bob', 'alice', 'carol'] and len(memory) == 0
+
+
+def test_stats_report_what_is_held():
+    memory = ConversationMemory(messages_per_user=10)
+    empty = memory.stats()['approx_bytes']
+    for i in range(25):
+        memory.append(f"user{i % 5}", 'x' * 100, 'general', 'neutral')
+    stats = memory.stats()
+    assert stats['users'] == 5 and stats['messages'] == 25 and stats['evicted_users'] == 0
+    assert stats['approx_bytes'] > empty + 25 * 100
@@ -0,0 +1,178 @@
+"""
+Checks the append-only conversation log and its compaction
+"""
+import datetime
+import json
+import random
+import threading
+import time
+from collections import Counter
+import conversation_store as store
+
+
+def entry(i):
+    return {'timestamp': f"2025-01-01T00:00:{i % 60:02d}", 'user_message': f"message {i}", 'intent': 'general'}
+
+
+def test_reads_legacy_history_and_new_entries(tmp_path):
+    (tmp_path / "alice_chat.json").write_text(json.dumps([entry(0), entry(1)], indent=2))
+    store.append_entry('alice', entry(2), directory=tmp_path)
+    assert [e['user_message'] for e in store.read_entries('alice', directory=tmp_path)] == ['message 0', 'message 1', 'message 2']
+
+    assert store.compact('alice', directory=tmp_path) == 3
+    assert not (tmp_path / "alice_chat.json").exists()
+    assert len(store.read_entries('alice', directory=tmp_path)) == 3
+    assert store.read_entries('nobody', directory=tmp_path / "missing") == []
+
+
+def test_compaction_keeps_the_newest_entries(tmp_path):
+    for i in range(store.MAX_ENTRIES * store.COMPACT_FACTOR + 5):
+        store.append_entry('bob', entry(i), directory=tmp_path)
+    deadline = time.time() + 5
+    while store.log_path('bob', tmp_path) in store._compacting and time.time() < deadline:
+        time.sleep(0.01)
+
+    lines = (tmp_path / "bob_chat.jsonl").read_text().splitlines()
+    assert len(lines) < store.MAX_ENTRIES * store.COMPACT_FACTOR
+    entries = store.read_entries('bob', directory=tmp_path)
+    assert len(entries) == store.MAX_ENTRIES
+    assert entries[-1]['user_message'] == f"message {store.MAX_ENTRIES * store.COMPACT_FACTOR + 4}"
+
+
+def test_torn_line_does_not_swallow_the_next_entry(tmp_path):
+    store.append_entry('carol', entry(0), directory=tmp_path)
+    with open(tmp_path / "carol_chat.jsonl", 'a') as f:
+        f.write('{"timestamp": "2025-01')
+    store.append_entry('carol', entry(1), directory=tmp_path, fsync=True)
+    assert [e['user_message'] for e in store.read_entries('carol', directory=tmp_path)] == ['message 0', 'message 1']
+
+
+def test_concurrent_appends_are_not_lost(tmp_path):
+    def worker(offset):
+        for i in range(50):
+            store.append_entry('dave', entry(offset + i), directory=tmp_path)
+
+    threads = [threading.Thread(target=worker, args=(k * 50,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store.read_entries('dave', directory=tmp_path)) == 200
+
+
+def expected_insights(entries):
+    cutoff = (datetime.date.today() - datetime.timedelta(days=store.RECENT_DAYS)).isoformat()
+    return {
+        'total': len(entries),
+        'intents': dict(Counter(e.get('intent', 'general') for e in entries)),
+        'sentiments': dict(Counter(e.get('sentiment', 'neutral') for e in entries)),
+        'recent_intents': Counter(e.get('intent', 'general') for e in entries if e['timestamp'][:10] >= cutoff),
+        'emotional_states': [e.get('emotional_state', {}) for e in entries[-store.EMOTIONAL_HISTORY:]],
+    }
+
+
+def chat_entry(rng, i):
+    day = datetime.date.today() - datetime.timedelta(days=rng.randint(0, 60))
+    return {
+        'timestamp': f"{day.isoformat()}T12:00:00", 'user_message': f"message {i}",
+        'intent': rng.choice(['mood', 'stress', 'anxiety', 'general']),
+        'sentiment': rng.choice(['positive', 'negative', 'neutral']),
+        'emotional_state': {'stress_level': i},
+    }
+
+
+def test_insights_track_the_retained_history(tmp_path):
+    rng = random.Random(0)
+    (tmp_path / "erin_chat.json").write_text(json.dumps([chat_entry(rng, i) for i in range(30)]))
+    for i in range(30, 700):
+        store.append_entry('erin', chat_entry(rng, i), directory=tmp_path)
+        if i % 37 == 0:
+            got = store.insights('erin', directory=tmp_path)
+            expected = expected_insights(store.read_entries('erin', directory=tmp_path))
+            assert got == expected
+            # Same order as Counter, so ties resolve the same way
+            assert list(got['intents']) == list(expected['intents'])
+        if i % 101 == 0:
+            # Another process appended behind our back, or we restarted
+            with open(store.log_path('erin', tmp_path), 'a') as f:
+                f.write(json.dumps(chat_entry(rng, -i)) + '\n')
+            store._insights.clear()
+    store.compact('erin', directory=tmp_path)
+    assert store.insights('erin', directory=tmp_path) == expected_insights(store.read_entries('erin', directory=tmp_path))
+    assert (tmp_path / "erin_insights.json").exists()
+    assert store.insights('nobody', directory=tmp_path) is None
+
+
+def test_write_behind_batches_per_user_and_flushes(tmp_path, monkeypatch):
+    writes, release = [], threading.Event()
+    append = store.append_entries
+
+    def slow_append(username, entries, directory=store.CONVERSATIONS_DIR, fsync=False):
+        release.wait(5)
+        writes.append((username, len(entries)))
+        append(username, entries, directory, fsync)
+
+    monkeypatch.setattr(store, 'append_entries', slow_append)
+    monkeypatch.chdir(tmp_path)
+    store.save_entry('frank', entry(0))
+    time.sleep(0.05)
+    # Queued while the first write is stuck on a slow disk
+    for i in range(1, 6):
+        store.save_entry('frank', entry(i))
+        store.save_entry('grace', entry(i))
+        store.save_state('frank', {'stress_level': i})
+    assert not store.flush(timeout=0.05)
+
+    monkeypatch.chdir(tmp_path.parent)
+    release.set()
+    assert store.flush(timeout=5)
+    assert writes == [('frank', 1), ('frank', 5), ('grace', 5)]
+    directory = tmp_path / store.CONVERSATIONS_DIR
+    assert [e['user_message'] for e in store.read_entries('frank', directory=directory)] == [f"message {i}" for i in range(6)]
+    assert store.read_state('frank', directory=directory) == {'stress_level': 5}
+    assert store.read_state('grace', directory=directory) is None
+
+
+def test_write_behind_applies_back_pressure(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(store, 'append_entries', lambda *args: release.wait(5))
+    for i in range(store.MAX_PENDING + store.BATCH_SIZE):
+        store.save_entry('henry', entry(i), directory=tmp_path)
+
+    blocked = threading.Thread(target=store.save_entry, args=('henry', entry(-1), tmp_path))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+    release.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    assert store.flush(timeout=5)
+
+
+def test_write_behind_retries_only_unwritten_appends(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(store, 'RETRY_DELAY', 0)
+    fsync = store.os.fsync
+
+    def failing_fsync(fd):
+        raise OSError(5, "I/O error")
+
+    # Fails after the lines are written: kept once, not retried
+    monkeypatch.setattr(store.os, 'fsync', failing_fsync)
+    store._with_retries(store.append_entries, 'ivan', [entry(0)], tmp_path, True)
+    monkeypatch.setattr(store.os, 'fsync', fsync)
+    assert [e['user_message'] for e in store.read_entries('ivan', directory=tmp_path)] == ['message 0']
+    assert 'a later step failed' in caplog.text
+
+    # Fails before anything is written: retried, then dropped with a log line
+    attempts = []
+
+    def failing_open(*args, **kwargs):
+        attempts.append(args)
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(store, 'open', failing_open, raising=False)
+    store._with_retries(store.append_entries, 'ivan', [entry(1)], tmp_path)
+    monkeypatch.undo()
+    assert len(attempts) == store.WRITE_RETRIES
+    assert "Dropped append_entries for 'ivan' after 3 attempts" in caplog.text
+    assert len(store.read_entries('ivan', directory=tmp_path)) == 1
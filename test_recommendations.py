@@ -0,0 +1,66 @@
+"""
+Checks that the columnar recommendation engine matches the row-wise rules
+"""
+import numpy as np
+import pandas as pd
+from analysis import generate_recommendation, generate_recommendations, _recommendation_text, _RULE_COLUMNS
+
+
+def make_surveys(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({c: rng.integers(1, 11, n) for c in _RULE_COLUMNS})
+    df['Sleep_Hours'] = rng.choice([4.0, 5.5, 6.0, 6.5, 7.0, 8.0, 9.0], n)
+    df['Exercise_Hours'] = rng.choice([0.0, 0.5, 1.0, 1.5, 2.0, 3.0], n)
+    df.insert(0, 'Name', [f"Student {i}" for i in range(n)])
+    return df
+
+
+def test_matches_row_wise_rules():
+    df = make_surveys(5000)
+    expected = df.apply(generate_recommendation, axis=1)
+    assert (generate_recommendations(df) == expected).all()
+
+
+def test_missing_optional_columns_use_defaults():
+    df = make_surveys(500, seed=1)[['Name', 'Stress_Level', 'Sleep_Hours', 'Exercise_Hours']]
+    expected = df.apply(generate_recommendation, axis=1)
+    assert (generate_recommendations(df) == expected).all()
+
+
+def test_missing_values_never_fire_rules():
+    df = make_surveys(500, seed=2).astype({'Social_Support': 'float64', 'Sleep_Hours': 'float64'})
+    df.loc[::3, 'Social_Support'] = np.nan
+    df.loc[::5, 'Sleep_Hours'] = np.nan
+    expected = df.apply(generate_recommendation, axis=1)
+    assert (generate_recommendations(df) == expected).all()
+
+
+def test_healthy_student_text():
+    df = pd.DataFrame([{
+        "Stress_Level": 3, "Sleep_Hours": 8.0, "Exercise_Hours": 3.0, "Social_Support": 8,
+    }])
+    assert generate_recommendations(df).iloc[0] == (
+        "**Immediate Actions:**\n"
+        "• Maintain your healthy habits! You're doing great.\n\n"
+        "**Long-term Strategies:**\n"
+        "• Monitor for changes and continue preventive care."
+    )
+
+
+def test_preserves_index_and_handles_empty_frames():
+    df = make_surveys(10, seed=3).set_index(pd.Index(range(100, 110)))
+    assert list(generate_recommendations(df).index) == list(df.index)
+    assert generate_recommendations(df.iloc[:0]).empty
+
+
+def test_rows_with_same_signature_share_one_string():
+    df = pd.concat([make_surveys(50, seed=4)] * 20, ignore_index=True)
+    recs = generate_recommendations(df)
+    assert len({id(text) for text in recs}) == recs.nunique()
+    assert generate_recommendation(df.iloc[0]) is recs.iloc[0]
+
+
+def test_signature_cache_is_bounded():
+    info = _recommendation_text.cache_info()
+    generate_recommendations(make_surveys(20000, seed=5))
+    assert _recommendation_text.cache_info().currsize <= info.maxsize
@@ -0,0 +1,216 @@
+"""
+Checks the typed Parquet results store
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import results_store
+from analysis import analyze_data
+from test_recommendations import make_surveys
+
+
+def test_round_trip_uses_compact_types(tmp_path):
+    path = tmp_path / "results.parquet"
+    df = analyze_data(make_surveys(200, seed=20))
+    results_store.write_results(df, path)
+
+    stored = results_store.read_results(path)
+    assert stored['Stress_Level'].dtype == 'Int8'
+    assert stored['Sleep_Hours'].dtype == 'float32'
+    assert isinstance(stored['Recommendation'].dtype, pd.CategoricalDtype)
+    assert (stored['Recommendation'].astype(object) == df['Recommendation']).all()
+    np.testing.assert_array_equal(stored['Stress_Level'].to_numpy(dtype='int64'), df['Stress_Level'])
+
+
+def test_legacy_csv_is_converted_once(tmp_path):
+    csv_path, path = tmp_path / "results.csv", tmp_path / "results.parquet"
+    analyze_data(make_surveys(30, seed=21)).to_csv(csv_path, index=False)
+
+    stored = results_store.read_results(path, legacy_csv_path=csv_path)
+    assert path.exists() and len(stored) == 30
+    assert results_store.read_results(tmp_path / "missing.parquet", legacy_csv_path=None).empty
+
+
+def test_out_of_range_scale_values_are_kept(tmp_path):
+    path = tmp_path / "results.parquet"
+    df = make_surveys(5, seed=22).astype({'Stress_Level': 'float64'})
+    df.loc[0, 'Stress_Level'] = 7.5
+    df.loc[1, 'Anxiety_Level'] = 300
+    results_store.write_results(df, path)
+
+    stored = results_store.read_results(path)
+    assert stored.loc[0, 'Stress_Level'] == 7.5
+    assert stored.loc[1, 'Anxiety_Level'] == 300
+
+
+def test_writer_appends_row_groups(tmp_path):
+    path = tmp_path / "results.parquet"
+    frames = [analyze_data(make_surveys(100, seed=s)) for s in (23, 24, 25)]
+    with results_store.ResultsWriter(path) as writer:
+        for frame in frames:
+            writer.write(frame)
+
+    batches = list(results_store.iter_results(path, batch_size=100))
+    assert [len(b) for b in batches] == [100, 100, 100]
+    assert (pd.concat(batches, ignore_index=True)['Recommendation'].astype(object)
+            == pd.concat(frames, ignore_index=True)['Recommendation']).all()
+
+
+def test_submissions_are_visible_before_and_after_compaction(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    results_store.write_results(analyze_data(make_surveys(50, seed=26)), path)
+    for record in analyze_data(make_surveys(5, seed=27)).to_dict('records'):
+        results_store.append_submission(record, path, fsync=False)
+
+    before = results_store.read_results(path)
+    assert len(before) == 55
+    assert results_store.compact_results(path) == 5
+    after = results_store.read_results(path)
+    pd.testing.assert_frame_equal(after, before, check_categorical=False)
+    assert not (tmp_path / "results.pending.jsonl").exists()
+
+
+def test_concurrent_submissions_survive_compaction(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = str(tmp_path / "results.parquet")
+    records = analyze_data(make_surveys(200, seed=28)).to_dict('records')
+
+    def submit(i):
+        results_store.append_submission(records[i], path, fsync=False)
+        if i % 40 == 0:
+            results_store.compact_results(path)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(submit, range(len(records))))
+    results_store.compact_results(path)
+
+    stored = results_store.read_results(path)
+    assert sorted(stored['Name']) == sorted(r['Name'] for r in records)
+
+
+def test_cached_results_follow_every_write(tmp_path, monkeypatch):
+    path = str(tmp_path / "results.parquet")
+    results_store.write_results(analyze_data(make_surveys(20, seed=29)), path)
+    first = results_store.cached_results(path)
+    reads = []
+    read = results_store.read_results
+    monkeypatch.setattr(results_store, 'read_results', lambda *args: reads.append(args) or read(*args))
+
+    first['Stress_Level'] = 0
+    assert (results_store.cached_results(path)['Stress_Level'] > 0).all() and reads == []
+
+    record = analyze_data(make_surveys(1, seed=30)).to_dict('records')[0]
+    results_store.append_submission(record, path, fsync=False)
+    assert len(results_store.cached_results(path)) == 21
+    results_store.compact_results(path)
+    assert len(results_store.cached_results(path)) == 21
+    results_store.write_results(results_store.cached_results(path).head(3), path)
+    assert len(results_store.cached_results(path)) == 3
+    assert len(reads) == 3
+
+
+def expected_latest(path, username):
+    df = results_store.read_results(path)
+    rows = df[df['Username'] == username]
+    return results_store.as_record(rows.iloc[-1]) if len(rows) else None
+
+
+def test_latest_submission_index_tracks_every_write(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    df = analyze_data(make_surveys(300, seed=31))
+    df.insert(0, 'Username', [f"user{i % 40}" for i in range(len(df))])
+    results_store.write_results(df, path)
+    assert (tmp_path / "results.latest.parquet").exists()
+
+    def check(*usernames):
+        for username in usernames:
+            got, expected = results_store.latest_submission(username, path), expected_latest(path, username)
+            # nan != nan, so compare with missing values dropped
+            assert (got and {k: v for k, v in got.items() if v == v}) == (expected and {k: v for k, v in expected.items() if v == v})
+
+    check('user0', 'user39', 'nobody')
+    for i, record in enumerate(analyze_data(make_surveys(6, seed=32)).to_dict('records')):
+        results_store.append_submission(dict(record, Username=f"user{i}"), path, fsync=False)
+        check(f"user{i}")
+    check('user0', 'user7', 'nobody')
+
+    results_store.compact_results(path)
+    results_store._latest_cache.clear()
+    check('user0', 'user5', 'user20')
+    # A Parquet file written elsewhere makes the persisted index stale
+    stored = results_store.read_results(path)
+    stored.loc[stored['Username'] == 'user3', 'Stress_Level'] = 1
+    results_store._write_parquet(stored, path)
+    results_store._latest_cache.clear()
+    check('user3')
+
+
+def test_results_page_filters_sorts_and_saves_edits(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    df = analyze_data(make_surveys(120, seed=29))
+    df.insert(0, 'Username', [f"user{i % 40}" for i in range(len(df))])
+    results_store.write_results(df, path)
+
+    page = results_store.results_page(2, 25, path=path)
+    assert (page.total, page.page, page.pages) == (120, 2, 5)
+    assert list(page.positions) == list(range(94, 69, -1)) and len(page.frame) == 25
+    assert (page.frame['Name'] == df['Name'].iloc[page.positions].to_numpy()).all()
+
+    page = results_store.results_page(9, 10, username='USER1', sort='Highest stress', path=path)
+    matches = df[df['Username'].str.contains('user1')]
+    assert page.total == len(matches) and page.page == page.pages == -(-len(matches) // 10)
+    full = results_store.results_page(1, 1000, username='user1', sort='Highest stress', path=path)
+    assert full.frame['Stress_Level'].is_monotonic_decreasing
+    assert sorted(full.positions) == list(matches.index)
+
+    page = results_store.results_page(1, 10, sort='Oldest first', path=path)
+    count = results_store.apply_edits(page.positions, {
+        'edited_rows': {0: {'Stress_Level': 9, 'Recommendation': 'Edited'}},
+        'deleted_rows': [1],
+        'added_rows': [{'Username': 'new', 'Stress_Level': 3}, {}],
+    }, path)
+    stored = results_store.read_results(path)
+    assert count == len(stored) == 120
+    assert stored.loc[0, 'Stress_Level'] == 9 and stored.loc[0, 'Recommendation'] == 'Edited'
+    assert stored.loc[1, 'Name'] == df.loc[2, 'Name']
+    assert stored['Username'].iloc[-1] == 'new'
+    # The edit invalidated the cached order
+    assert results_store.results_page(1, 10, path=path).frame['Username'].iloc[0] == 'new'
+
+
+def test_results_page_without_usernames(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    results_store.write_results(analyze_data(make_surveys(30, seed=33)), path)
+
+    assert results_store.results_page(1, 5, username='abc', path=path).total == 0
+    page = results_store.results_page(1, 5, sort='Username', path=path)
+    assert page.total == 30 and len(page.frame) == 5
+
+
+def test_write_back_keeps_submissions_logged_meanwhile(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    df = analyze_data(make_surveys(4, seed=34))
+    df.insert(0, 'Username', [f"user{i}" for i in range(4)])
+    results_store.write_results(df.iloc[:3], path)
+    results_store.append_submission(df.iloc[3].to_dict(), path, fsync=False)
+
+    # Re-analysis reads the store, and a student submits before it writes back
+    results, version = results_store.snapshot_results(path)
+    assert len(results) == 4
+    late = dict(df.iloc[0].to_dict(), Username='late')
+    results_store.append_submission(late, path, fsync=False)
+    results_store.write_results(results, path, based_on=version)
+
+    stored = results_store.read_results(path)
+    assert list(stored['Username']) == ['user0', 'user1', 'user2', 'user3', 'late']
+    assert results_store.latest_submission('late', path)['Username'] == 'late'
+
+    # A compaction meanwhile (the live log folded into the Parquet file) is
+    # refused rather than overwritten
+    results, version = results_store.snapshot_results(path)
+    results_store.append_submission(dict(late, Username='later'), path, fsync=False)
+    results_store.compact_results(path)
+    with pytest.raises(results_store.ResultsChanged):
+        results_store.write_results(results, path, based_on=version)
+    assert len(results_store.read_results(path)) == 6
@@ -0,0 +1,94 @@
+"""
+Checks the folded linear scorer against the sklearn pipeline it was built from
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import analysis
+from test_recommendations import make_surveys
+
+analysis._load_model()
+pytestmark = pytest.mark.skipif(analysis._SCORER is None, reason="trained model not available")
+
+
+def test_frame_scores_match_pipeline():
+    df = make_surveys(2000, seed=11)
+    expected = analysis._MODEL.predict_proba(df[analysis._FEATURES])[:, 1]
+    np.testing.assert_allclose(analysis._predict_risk(df), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_single_record_matches_frame():
+    df = make_surveys(20, seed=12)
+    expected = analysis._predict_risk(df)
+    for i, record in enumerate(df.to_dict('records')):
+        assert analysis.predict_risk_single(record) == pytest.approx(expected[i], rel=1e-9)
+
+
+def test_missing_features_score_as_zero():
+    record = {"Stress_Level": 7, "Sleep_Hours": 6.0, "Exercise_Hours": 1.0}
+    full = dict.fromkeys(analysis._FEATURES, 0)
+    full.update(record)
+    expected = analysis._MODEL.predict_proba(pd.DataFrame([full])[analysis._FEATURES])[:, 1][0]
+    assert analysis.predict_risk_single(record) == pytest.approx(expected, rel=1e-9)
+
+
+def test_missing_values_are_rejected():
+    with pytest.raises(ValueError):
+        analysis.predict_risk_single({"Stress_Level": float('nan'), "Sleep_Hours": 6.0, "Exercise_Hours": 1.0})
+
+
+def test_extreme_inputs_saturate_without_overflow():
+    # Far enough out that exp(-z) overflows a float on one side or the other
+    scorer = analysis._LinearRiskScorer(["Stress_Level"], np.array([1.0]), 0.0)
+    df = pd.DataFrame({"Stress_Level": [-1e6, -800.0, 0.0, 800.0, 1e6]})
+    with np.errstate(over='raise'):
+        scores = scorer.score_frame(df)
+    np.testing.assert_allclose(scores, [0.0, 0.0, 0.5, 1.0, 1.0], atol=1e-300)
+    for record, score in zip(df.to_dict('records'), scores):
+        assert scorer.score_record(record) == score
+
+
+def _write_model(dirpath, seed):
+    from joblib import dump
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    df = make_surveys(300, seed=seed)
+    features = ["Stress_Level", "Sleep_Hours", "Exercise_Hours"]
+    y = (df["Stress_Level"] > 7) | (df["Sleep_Hours"] < 6)
+    pipe = Pipeline([("scaler", StandardScaler()), ("clf", LogisticRegression())]).fit(df[features], y)
+    (dirpath / "feature_list.json").write_text('{"features": ["Stress_Level", "Sleep_Hours", "Exercise_Hours"]}')
+    dump(pipe, dirpath / "model.tmp")
+    (dirpath / "model.tmp").replace(dirpath / "model.joblib")
+    return pipe
+
+
+def test_registry_swaps_in_retrained_model(tmp_path):
+    registry = analysis._ModelRegistry(str(tmp_path / "model.joblib"), str(tmp_path / "feature_list.json"), check_interval=0)
+    assert registry.current().model is None
+
+    _write_model(tmp_path, seed=1)
+    first = registry.current()
+    assert first.model is not None and first.scorer is not None
+    assert registry.current() is first
+
+    pipe = _write_model(tmp_path, seed=2)
+    second = registry.current()
+    assert second.version != first.version
+    df = make_surveys(50, seed=3)
+    np.testing.assert_allclose(second.scorer.score_frame(df), pipe.predict_proba(df[second.features])[:, 1])
+
+
+def test_registry_serves_concurrent_readers_during_reload(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    registry = analysis._ModelRegistry(str(tmp_path / "model.joblib"), str(tmp_path / "feature_list.json"), check_interval=0)
+    _write_model(tmp_path, seed=1)
+    versions = {registry.current().version}
+    _write_model(tmp_path, seed=2)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        snapshots = list(pool.map(lambda _: registry.current(), range(200)))
+    assert all(s.model is not None for s in snapshots)
+    versions.update(s.version for s in snapshots)
+    assert registry.current().version in versions and len(versions) == 2
@@ -0,0 +1,30 @@
+"""
+Checks the signed session tokens
+"""
+import session_store
+
+ACCOUNT = {"password": "pw", "is_admin": False}
+
+
+def test_tokens_verify_without_stored_state(tmp_path, monkeypatch):
+    db = str(tmp_path / "users.db")
+    monkeypatch.delenv('SESSION_SECRET', raising=False)
+    monkeypatch.setattr(session_store, '_secret', None)
+    assert session_store.secret_key(str(tmp_path / "secret")) == (tmp_path / "secret").read_bytes()
+
+    token = session_store.issue_token("amy", "pw", now=1000)
+    assert session_store.verify_token("amy", token, ACCOUNT, now=1001, path=db)
+    assert not session_store.needs_refresh(token, now=1001)
+    assert session_store.needs_refresh(token, now=1000 + session_store.SESSION_TTL * 0.6)
+
+    # Expired, for another user, forged or malformed
+    assert not session_store.verify_token("amy", token, ACCOUNT, now=1000 + session_store.SESSION_TTL, path=db)
+    assert not session_store.verify_token("bob", token, ACCOUNT, now=1001, path=db)
+    expires, signature = token.split('.')
+    assert not session_store.verify_token("amy", f"{int(expires) + 60}.{signature}", ACCOUNT, now=1001, path=db)
+    assert not session_store.verify_token("amy", "garbage", ACCOUNT, now=1001, path=db)
+
+    # A new password or a logout ends the session
+    assert not session_store.verify_token("amy", token, {"password": "new"}, now=1001, path=db)
+    session_store.revoke_token(token, now=1001, path=db)
+    assert not session_store.verify_token("amy", token, ACCOUNT, now=1001, path=db)
@@ -0,0 +1,24 @@
+"""
+Checks where the risk model's training data comes from
+"""
+import results_store
+import train_model
+from analysis import analyze_data
+from test_recommendations import make_surveys
+
+
+def test_training_data_includes_uncompacted_submissions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_surveys(20, seed=30).to_csv(train_model.RAW_DATA_PATH, index=False)
+    df, source = train_model.load_training_data()
+    assert source == train_model.RAW_DATA_PATH and len(df) == 20
+
+    # Only the submission log exists so far
+    for record in analyze_data(make_surveys(3, seed=31)).to_dict('records'):
+        results_store.append_submission(record, fsync=False)
+    df, source = train_model.load_training_data()
+    assert source == results_store.RESULTS_PATH and len(df) == 3
+
+    results_store.compact_results()
+    results_store.append_submission(analyze_data(make_surveys(1, seed=32)).to_dict('records')[0], fsync=False)
+    assert len(train_model.load_training_data()[0]) == 4
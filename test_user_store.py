@@ -0,0 +1,67 @@
+"""
+Checks the SQLite user account store
+"""
+import json
+import threading
+import user_store
+
+
+def test_accounts_migrate_from_json_once(tmp_path):
+    (tmp_path / "users.json").write_text(json.dumps({"old": "secret", "admin": {"password": "pw", "is_admin": True}}))
+    path = str(tmp_path / "users.db")
+    users = user_store.find_users(path=path)
+    assert users["old"] == {"password": "secret", "is_admin": False, "is_super_admin": False, "security_question": "", "security_answer": ""}
+    assert users["admin"]["is_admin"] is True and users["admin"]["is_super_admin"] is False
+
+    # users.json is not read again
+    (tmp_path / "users.json").write_text(json.dumps({"new": "x"}))
+    assert list(user_store.find_users(path=path)) == ["admin", "old"]
+
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert user_store.find_users(path=str(empty / "users.db")) == user_store.DEFAULT_USERS
+
+
+def test_account_changes_touch_one_row(tmp_path):
+    path = str(tmp_path / "users.db")
+    account = {"password": "pw", "is_admin": False, "is_super_admin": False, "security_question": "q", "security_answer": "a"}
+    assert user_store.create_user("amy", account, path)
+    assert not user_store.create_user("amy", dict(account, password="other"), path)
+    assert user_store.get_user("amy", path) == account
+
+    assert user_store.update_user("amy", path, password="new", is_admin=True)
+    assert user_store.get_user("amy", path)["password"] == "new"
+    assert not user_store.update_user("nobody", path, password="x")
+    assert list(user_store.find_users(is_admin=True, path=path)) == ["amy"]
+    assert list(user_store.find_users(is_admin=False, is_super_admin=False, path=path)) == ["student"]
+    assert user_store.count_users(path=path) == 3
+
+    assert user_store.delete_user("amy", path) and user_store.get_user("amy", path) is None
+    assert not user_store.delete_user("amy", path)
+
+
+def test_concurrent_registrations_are_not_lost(tmp_path):
+    path = str(tmp_path / "users.db")
+    user_store.find_users(path=path)
+
+    def register(worker):
+        for i in range(50):
+            user_store.create_user(f"user{worker}_{i}", {"password": "pw"}, path)
+
+    threads = [threading.Thread(target=register, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert user_store.count_users(is_admin=False, is_super_admin=False, path=path) == 201
+
+
+def test_accounts_are_paged_by_username(tmp_path):
+    path = str(tmp_path / "users.db")
+    for i in range(25):
+        user_store.create_user(f"user{i:02d}", {"password": "pw"}, path)
+    regular = dict(is_admin=False, is_super_admin=False, path=path)
+    assert user_store.count_users(**regular) == 26
+    pages = [list(user_store.find_users(offset=offset, limit=10, **regular)) for offset in (0, 10, 20)]
+    assert [len(p) for p in pages] == [10, 10, 6]
+    assert sum(pages, []) == sorted(["student"] + [f"user{i:02d}" for i in range(25)])
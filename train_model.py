@@ -8,10 +8,10 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score, f1_score, classification_report
 from joblib import dump
 
-DATA_CANDIDATES = [
-    "student_survey_results.csv",  # produced by the app for multiple submissions
-    "student_survey.csv",          # raw CSV as per README
-]
+import results_store
+
+# Raw survey CSV as per README, used when the app has stored no results yet
+RAW_DATA_PATH = "student_survey.csv"
 
 FEATURES_PREFERRED = [
     "Stress_Level",
@@ -27,22 +27,37 @@ FEATURES_PREFERRED = [
 ]
 
 
-def find_data_path():
-    for p in DATA_CANDIDATES:
-        if os.path.exists(p):
-            return p
-    raise FileNotFoundError(
-        "No survey data found. Expected one of: " + ", ".join(DATA_CANDIDATES)
-    )
+def _as_float(df: pd.DataFrame) -> pd.DataFrame:
+    # Nullable Int8 etc. -> float64 so missing answers act as NaN, like CSV input
+    return df.astype({c: "float64" for c in df.columns if isinstance(df[c].dtype, pd.api.extensions.ExtensionDtype) and df[c].dtype.kind in "iuf"})
 
 
 def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
+    if path.endswith(".parquet"):
+        # Through the results store, so submissions not yet compacted count
+        df = _as_float(results_store.read_results(path, legacy_csv_path=None))
+    else:
+        df = pd.read_csv(path)
     # Basic cleaning: drop completely empty rows
     df = df.dropna(how="all")
     return df
 
 
+def load_training_data():
+    """The results stored by the app (the Parquet file, submissions still in
+    its log, or the older CSV, converted on first use), or the raw survey CSV
+    if there are none. Returns the frame and a description of its source.
+    """
+    df = _as_float(results_store.read_results()).dropna(how="all")
+    if len(df):
+        return df, results_store.RESULTS_PATH
+    if os.path.exists(RAW_DATA_PATH):
+        return load_data(RAW_DATA_PATH), RAW_DATA_PATH
+    raise FileNotFoundError(
+        f"No survey data found: no stored results in {results_store.RESULTS_PATH} and no {RAW_DATA_PATH}"
+    )
+
+
 def build_proxy_label(df: pd.DataFrame) -> pd.Series:
     # Proxy rule aligned with README thresholds
     stress = df.get("Stress_Level", pd.Series([0]*len(df)))
@@ -64,8 +79,8 @@ def pick_features(df: pd.DataFrame):
 
 
 def main():
-    data_path = find_data_path()
-    df = load_data(data_path)
+    df, source = load_training_data()
+    print(f"Training on {len(df)} rows from {source}")
 
     # Create or use an existing label
     y = df["high_risk"] if "high_risk" in df.columns else build_proxy_label(df)
@@ -112,11 +127,16 @@ def main():
     else:
         print("Warning: Test set does not contain both classes; skipping metrics.")
 
-    # Persist
+    # Persist. Write to temp files and rename so a running app, which reloads
+    # the model when these files change, never reads a half-written artifact.
     os.makedirs("models", exist_ok=True)
-    dump(pipe, os.path.join("models", "risk_model.joblib"))
-    with open(os.path.join("models", "feature_list.json"), "w") as f:
+    features_path = os.path.join("models", "feature_list.json")
+    with open(features_path + ".tmp", "w") as f:
         json.dump({"features": feature_cols}, f)
+    os.replace(features_path + ".tmp", features_path)
+    model_path = os.path.join("models", "risk_model.joblib")
+    dump(pipe, model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
 
     print("Saved model to models/risk_model.joblib with features:", feature_cols)
 
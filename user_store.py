@@ -0,0 +1,198 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# User accounts live in an SQLite database, one row per account, so a login
+# or an account change reads or writes only that account. The database runs
+# in WAL mode: readers do not block the writer, and several server processes
+# can share it. The first time a database is opened, the accounts in the
+# users.json beside it are copied in (DEFAULT_USERS if there is none); the
+# JSON file is left in place, but is not read again.
+USERS_DB = 'users.db'
+USERS_PATH = 'users.json'
+
+DEFAULT_USERS = {
+    "student": {"password": "pass", "is_admin": False, "security_question": "", "security_answer": "", "is_super_admin": False},
+    "Sujith": {"password": "Sujith@123", "is_admin": False, "is_super_admin": True, "security_question": "", "security_answer": ""},
+}
+
+FIELDS = ('password', 'is_admin', 'is_super_admin', 'security_question', 'security_answer')
+_FLAGS = ('is_admin', 'is_super_admin')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    is_super_admin INTEGER NOT NULL DEFAULT 0,
+    security_question TEXT NOT NULL DEFAULT '',
+    security_answer TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS users_by_role ON users (is_admin, is_super_admin, username);
+CREATE TABLE IF NOT EXISTS revoked_sessions (
+    token TEXT PRIMARY KEY,
+    expires INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+# sqlite3 connections are not shared between threads; each thread (each
+# Streamlit session runs in its own) keeps one per database
+_local = threading.local()
+
+
+def normalize_users(raw_users):
+    """Fill in the account fields older users.json files lack; a bare string
+    value is the password of a regular user.
+    """
+    users = {}
+    for k, v in raw_users.items():
+        if isinstance(v, str):
+            users[k] = {"password": v, "is_admin": False, "security_question": "", "security_answer": "", "is_super_admin": False}
+        else:
+            users[k] = dict(v)
+            users[k].setdefault('security_question', "")
+            users[k].setdefault('security_answer', "")
+            users[k].setdefault('is_super_admin', False)
+    return users
+
+
+def _legacy_path(path):
+    return os.path.join(os.path.dirname(path), USERS_PATH)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    _migrate(conn, _legacy_path(path))
+    return conn
+
+
+def _connection(path):
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = os.path.abspath(path)
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = _connect(path)
+    return conn
+
+
+@contextmanager
+def _transaction(conn):
+    # IMMEDIATE takes the write lock up front, so two processes cannot both
+    # read, then both write
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def _row(account):
+    return tuple(int(bool(account.get(f, False))) if f in _FLAGS else str(account.get(f, '') or '') for f in FIELDS)
+
+
+def _insert(conn, users):
+    conn.executemany(f"INSERT OR IGNORE INTO users (username, {', '.join(FIELDS)}) VALUES (?{', ?' * len(FIELDS)})",
+                     ((username, *_row(account)) for username, account in users.items()))
+
+
+def _migrate(conn, legacy_path):
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+        return
+    with _transaction(conn):
+        # Another process may have migrated while this one waited
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+            return
+        source = DEFAULT_USERS
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as f:
+                source = normalize_users(json.load(f))
+        _insert(conn, source)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)",
+                     (legacy_path if source is not DEFAULT_USERS else '',))
+
+
+def _account(row):
+    return {f: bool(row[f]) if f in _FLAGS else row[f] for f in FIELDS}
+
+
+def get_user(username, path=USERS_DB):
+    """The account of username, or None."""
+    row = _connection(path).execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+    return _account(row) if row else None
+
+
+def create_user(username, account, path=USERS_DB):
+    """Add an account; returns False (and changes nothing) if username is taken."""
+    cursor = _connection(path).execute(
+        f"INSERT OR IGNORE INTO users (username, {', '.join(FIELDS)}) VALUES (?{', ?' * len(FIELDS)})",
+        (username, *_row(account)))
+    return cursor.rowcount == 1
+
+
+def update_user(username, path=USERS_DB, **fields):
+    """Set the given account fields; returns False if there is no such user."""
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown account fields: {', '.join(sorted(unknown))}")
+    if not fields:
+        return get_user(username, path) is not None
+    values = [int(bool(v)) if f in _FLAGS else v for f, v in fields.items()]
+    cursor = _connection(path).execute(
+        f"UPDATE users SET {', '.join(f'{f} = ?' for f in fields)} WHERE username = ?", (*values, username))
+    return cursor.rowcount == 1
+
+
+def delete_user(username, path=USERS_DB):
+    """Remove an account; returns False if there is no such user."""
+    return _connection(path).execute("DELETE FROM users WHERE username = ?", (username,)).rowcount == 1
+
+
+def _role_filter(is_admin, is_super_admin):
+    clauses, params = [], []
+    for field, value in (('is_admin', is_admin), ('is_super_admin', is_super_admin)):
+        if value is not None:
+            clauses.append(f"{field} = ?")
+            params.append(int(bool(value)))
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def find_users(is_admin=None, is_super_admin=None, offset=0, limit=None, path=USERS_DB):
+    """Accounts by username, optionally only those with the given role flags
+    and only the page offset..offset+limit.
+    """
+    where, params = _role_filter(is_admin, is_super_admin)
+    rows = _connection(path).execute(
+        f"SELECT * FROM users{where} ORDER BY username LIMIT ? OFFSET ?",
+        (*params, -1 if limit is None else limit, offset))
+    return {row['username']: _account(row) for row in rows}
+
+
+def count_users(is_admin=None, is_super_admin=None, path=USERS_DB):
+    where, params = _role_filter(is_admin, is_super_admin)
+    return _connection(path).execute(f"SELECT COUNT(*) FROM users{where}", params).fetchone()[0]
+
+
+def revoke_session(token, expires, now, path=USERS_DB):
+    """Record a logged-out session token until it expires."""
+    conn = _connection(path)
+    with _transaction(conn):
+        conn.execute("DELETE FROM revoked_sessions WHERE expires <= ?", (int(now),))
+        conn.execute("INSERT OR REPLACE INTO revoked_sessions (token, expires) VALUES (?, ?)", (token, int(expires)))
+
+
+def session_revoked(token, path=USERS_DB):
+    return _connection(path).execute("SELECT 1 FROM revoked_sessions WHERE token = ?", (token,)).fetchone() is not None